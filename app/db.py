@@ -1,38 +1,191 @@
 ﻿from __future__ import annotations
 
-from sqlalchemy import inspect
+from functools import cache
+import os
+from threading import Lock
+from typing import Any
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Connection, Dialect, Engine
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from sqlmodel import Session, SQLModel, create_engine
 
 DATABASE_URL = "sqlite:///./yt_analytics.db"
-engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
+SessionLocal = sessionmaker(class_=Session, expire_on_commit=False, autoflush=False)
+_engine: Engine | None = None
+_engine_lock = Lock()
+
+
+def _apply_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA cache_size=-65536")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is not None:
+        return _engine
+    with _engine_lock:
+        if _engine is None:
+            database_url = (os.getenv("DATABASE_URL") or "").strip() or DATABASE_URL
+            if database_url.startswith("sqlite"):
+                new_engine = create_engine(
+                    database_url,
+                    echo=False,
+                    poolclass=QueuePool,
+                    pool_size=5,
+                    max_overflow=10,
+                    connect_args={"check_same_thread": False, "timeout": 30},
+                )
+                event.listen(new_engine, "connect", _apply_sqlite_pragmas)
+            else:
+                new_engine = create_engine(database_url, echo=False, pool_size=5, max_overflow=10)
+            SessionLocal.configure(bind=new_engine)
+            _engine = new_engine
+    return _engine
+
+
+def __getattr__(name: str) -> Any:
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Ordered schema revisions on top of the tables create_all() builds. Each revision runs once per
+# database and is recorded in schema_version; add a new revision instead of editing an applied one.
+SCHEMA_REVISIONS: dict[int, tuple[tuple[str, str, str], ...]] = {
+    2: (
+        ("channel", "avatar_url", "TEXT"),
+        ("channel", "subscriber_count", "INTEGER"),
+        ("channel", "delta_total_views", "INTEGER"),
+        ("channel", "delta_avg_views", "INTEGER"),
+        ("channel", "delta_median_views", "INTEGER"),
+        ("channel", "delta_top_video_views", "INTEGER"),
+        ("channel", "delta_total_likes", "INTEGER"),
+        ("channel", "delta_total_comments", "INTEGER"),
+        ("video", "thumbnail_url", "TEXT"),
+        ("video", "comment_count", "INTEGER"),
+        ("video", "view_delta", "INTEGER"),
+        ("video", "like_delta", "INTEGER"),
+        ("video", "comment_delta", "INTEGER"),
+    ),
+    # Index-only revision: picks up indexes declared on models after their table already existed.
+    3: (),
+    # 4 was an unreleased Channel.updated_at column; skipped so databases that applied it still migrate.
+    5: (("video", "feed_position", "INTEGER"),),
+}
+SCHEMA_VERSION = max(SCHEMA_REVISIONS)
+
+
+@cache
+def _add_column_clause(dialect: Dialect, column_name: str, column_sql: str, if_not_exists: bool = False) -> str:
+    guard = "IF NOT EXISTS " if if_not_exists else ""
+    return f"ADD COLUMN {guard}{dialect.identifier_preparer.quote(column_name)} {column_sql}"
+
 
+@cache
+def _alter_table_prefix(dialect: Dialect, table_name: str) -> str:
+    return f"ALTER TABLE {dialect.identifier_preparer.quote(table_name)}"
 
-def _ensure_column(table_name: str, column_name: str, column_sql: str) -> None:
-    inspector = inspect(engine)
-    existing = {col["name"] for col in inspector.get_columns(table_name)}
-    if column_name in existing:
+
+def _ensure_column(conn: Connection, table_name: str, column_name: str, column_sql: str) -> None:
+    ddl = f"{_alter_table_prefix(conn.dialect, table_name)} {_add_column_clause(conn.dialect, column_name, column_sql)}"
+    try:
+        conn.exec_driver_sql(ddl)
+    except OperationalError as exc:
+        if "duplicate column name" not in str(exc).lower():
+            raise
+
+
+def _apply_revision_batched(conn: Connection, steps: tuple[tuple[str, str, str], ...]) -> None:
+    clauses_by_table: dict[str, list[str]] = {}
+    for table_name, column_name, column_sql in steps:
+        clauses_by_table.setdefault(table_name, []).append(
+            _add_column_clause(conn.dialect, column_name, column_sql, if_not_exists=True)
+        )
+    for table_name, clauses in clauses_by_table.items():
+        conn.exec_driver_sql(f"{_alter_table_prefix(conn.dialect, table_name)} {', '.join(clauses)}")
+
+
+def _migrate_schema(conn: Connection) -> None:
+    is_sqlite = conn.dialect.name == "sqlite"
+    # Tables created just now already have the final shape; only older ones may need ALTERs.
+    preexisting_tables = set(inspect(conn).get_table_names())
+    SQLModel.metadata.create_all(conn)
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS schema_version (v INTEGER PRIMARY KEY)")
+    current_version = conn.exec_driver_sql("SELECT MAX(v) FROM schema_version").scalar() or 0
+    if current_version >= SCHEMA_VERSION:
         return
-    with engine.begin() as conn:
-        conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_sql}")
+
+    if is_sqlite:
+        # pysqlite runs DDL in autocommit mode, so open the transaction explicitly to commit all ALTERs once.
+        conn.exec_driver_sql("BEGIN")
+    for revision in sorted(SCHEMA_REVISIONS):
+        if revision <= current_version:
+            continue
+        steps = tuple(step for step in SCHEMA_REVISIONS[revision] if step[0] in preexisting_tables)
+        if not is_sqlite:
+            _apply_revision_batched(conn, steps)
+            continue
+        for table_name, column_name, column_sql in steps:
+            _ensure_column(conn, table_name, column_name, column_sql)
+    # create_all() skips indexes on tables that already exist, so add any missing ones explicitly.
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in preexisting_tables:
+            continue
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    conn.execute(text("DELETE FROM schema_version"))
+    conn.execute(text("INSERT INTO schema_version (v) VALUES (:v)"), {"v": SCHEMA_VERSION})
 
 
+def _read_schema_version(engine: Engine) -> int:
+    try:
+        with engine.connect() as conn:
+            return conn.exec_driver_sql("SELECT MAX(v) FROM schema_version").scalar() or 0
+    except DBAPIError:
+        return 0
+
+
+@cache
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
-    _ensure_column("channel", "avatar_url", "TEXT")
-    _ensure_column("channel", "subscriber_count", "INTEGER")
-    _ensure_column("channel", "delta_total_views", "INTEGER")
-    _ensure_column("channel", "delta_avg_views", "INTEGER")
-    _ensure_column("channel", "delta_median_views", "INTEGER")
-    _ensure_column("channel", "delta_top_video_views", "INTEGER")
-    _ensure_column("channel", "delta_total_likes", "INTEGER")
-    _ensure_column("channel", "delta_total_comments", "INTEGER")
-    _ensure_column("video", "thumbnail_url", "TEXT")
-    _ensure_column("video", "comment_count", "INTEGER")
-    _ensure_column("video", "view_delta", "INTEGER")
-    _ensure_column("video", "like_delta", "INTEGER")
-    _ensure_column("video", "comment_delta", "INTEGER")
+    engine = get_engine()
+    # Steady state is one SELECT; create_all() and its per-table probes only run when behind.
+    if _read_schema_version(engine) < SCHEMA_VERSION:
+        with engine.begin() as conn:
+            _migrate_schema(conn)
+
+
+def dispose_engine() -> None:
+    # The engine stays usable afterwards: a refresh still running during shutdown just opens a new connection.
+    engine = _engine
+    if engine is None:
+        return
+    if engine.dialect.name == "sqlite":
+        try:
+            with engine.connect() as conn:
+                # Fold the WAL into the main file so nothing committed lives only in the -wal sidecar.
+                conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+        except DBAPIError:
+            pass
+    engine.dispose()
 
 
+# Sessions stay request-scoped on purpose: FastAPI may enter and exit a sync dependency on
+# different worker threads, so a thread-keyed scoped_session could hand one request's identity
+# map to another or remove the wrong session.
 def get_session():
-    with Session(engine) as session:
+    get_engine()
+    session = SessionLocal()
+    try:
         yield session
+    finally:
+        session.close()
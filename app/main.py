@@ -1,52 +1,162 @@
 from __future__ import annotations
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import csv
+from dataclasses import dataclass, field
+from enum import Enum
 import http.cookiejar
 import io
 import hashlib
+import heapq
 import hmac
 import time
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
-from threading import Lock
+from threading import Event, Lock
 from typing import Any
 from urllib.parse import quote_plus, urlencode, urlparse
-import urllib.request
-import urllib.error
 import re
+import shutil
 from uuid import uuid4
 
+import httpx
+import orjson
 from fastapi import BackgroundTasks, Depends, FastAPI, File, Form, Request, UploadFile
-from fastapi.responses import JSONResponse, RedirectResponse, Response
+from fastapi.responses import ORJSONResponse, RedirectResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, delete, func, select
+from sqlmodel import Session, delete, func, insert, or_, select, update
 
-from app.db import engine, get_session, init_db
+from app.db import SessionLocal, dispose_engine, get_session, init_db
 from app.models import Channel, ChannelSnapshot, Video
 from app.services.ytdlp_service import YtDlpFetchError, fetch_channel_data
+from app.services.ytdlp_service import shutdown as shutdown_ytdlp_service
 from app.settings import settings, update_settings, write_auth_env_settings
 
-app = FastAPI(title="YT Analytics")
+app = FastAPI(title="YT Analytics", default_response_class=ORJSONResponse)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 templates = Jinja2Templates(directory="app/templates")
 COOKIE_STORE_DIR = Path(__file__).resolve().parent.parent / "data" / "cookies"
 COOKIE_STORE_FILE = COOKIE_STORE_DIR / "instagram_cookies.txt"
 AVATAR_STORE_DIR = Path(__file__).resolve().parent / "static" / "avatars"
-REFRESH_JOBS: dict[str, dict[str, Any]] = {}
-REFRESH_JOBS_LOCK = Lock()
 REFRESH_JOB_TTL_HOURS = 24
 REFRESH_JOB_MAX_STORED = 200
+REFRESH_ALL_MAX_WORKERS = 4
+REFRESH_JOB_EVENTS_HEARTBEAT_SECONDS = 15
 AUTH_COOKIE_NAME = "tg_auth"
 AUTH_COOKIE_MAX_AGE = 60 * 60 * 24 * 30
 TELEGRAM_AUTH_MAX_AGE_SECONDS = 60 * 5
+STREAM_CHUNK_SIZE = 1 << 16
+COOKIE_FILE_CACHE_TTL_SECONDS = 5
+CSV_EXPORT_YIELD_PER = 1000
+BROWSER_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0.0.0 Safari/537.36"
+)
+# Shared keep-alive pool for avatar downloads; httpx.Client is safe to use from threadpool workers.
+HTTP_CLIENT = httpx.Client(
+    timeout=20,
+    follow_redirects=True,
+    headers={"User-Agent": BROWSER_USER_AGENT},
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+)
+# Avatar downloads run off the refresh path; the channel keeps the remote URL until one finishes.
+AVATAR_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="avatar")
+
+
+class RefreshStatus(str, Enum):
+    REFRESHED = "refreshed"
+    SKIPPED = "skipped"
+    FAILED = "failed"
+
+
+@dataclass
+class RefreshJob:
+    job_id: str
+    redirect_url: str
+    started_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    finished: bool = False
+    finished_at: str = ""
+    # Monotonic twins of the ISO timestamps, used only for TTL/eviction ordering.
+    started_at_mono: int = field(default_factory=time.monotonic_ns)
+    finished_at_mono: int | None = None
+    cancel_event: Event = field(default_factory=Event)
+    cancel_requested_at: str = ""
+    cancelled: bool = False
+    done: int = 0
+    total: int = 0
+    refreshed: int = 0
+    skipped: int = 0
+    failed: int = 0
+    current: str = ""
+    message: str = ""
+    # (event loop, asyncio.Event) pairs of open /events streams, woken from worker threads.
+    subscribers: list[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = field(default_factory=list)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def notify(self) -> None:
+        for loop, changed in list(self.subscribers):
+            try:
+                loop.call_soon_threadsafe(changed.set)
+            except RuntimeError:
+                pass
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "started_at": self.started_at,
+            "finished": self.finished,
+            "finished_at": self.finished_at,
+            "cancel_requested": self.cancel_requested,
+            "cancel_requested_at": self.cancel_requested_at,
+            "cancelled": self.cancelled,
+            "done": self.done,
+            "total": self.total,
+            "refreshed": self.refreshed,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "current": self.current,
+            "message": self.message,
+            "redirect_url": self.redirect_url,
+        }
 
-SUPPORTED_LANGS = {"en", "ru"}
-SUPPORTED_THEMES = {"light", "dark"}
-SUPPORTED_SECTIONS = {"overview", "charts", "settings"}
-SUPPORTED_VIDEO_SORTS = {"upload_date", "views", "likes", "comments", "title"}
-SUPPORTED_VIDEO_ORDERS = {"asc", "desc"}
+
+# Each job has a single writer (its background task), so progress fields are plain attribute
+# writes; the lock only guards inserting, iterating and evicting jobs.
+REFRESH_JOBS: dict[str, RefreshJob] = {}
+REFRESH_JOBS_LOCK = Lock()
+# (expires at monotonic, configured path, resolved path) for _effective_instagram_cookie_file.
+_cookie_file_cache: tuple[float, str, str] | None = None
+
+SUPPORTED_LANGS = frozenset({"en", "ru"})
+SUPPORTED_THEMES = frozenset({"light", "dark"})
+SUPPORTED_SECTIONS = frozenset({"overview", "charts", "settings"})
+SUPPORTED_VIDEO_SORTS = frozenset({"upload_date", "views", "likes", "comments", "title"})
+SUPPORTED_VIDEO_ORDERS = frozenset({"asc", "desc"})
 PLATFORM_ORDER = ["youtube", "tiktok", "instagram", "twitch", "x", "other"]
+PLATFORM_RANK = {name: idx for idx, name in enumerate(PLATFORM_ORDER)}
+_PLATFORM_BY_DOMAIN = {
+    "youtube.com": "youtube",
+    "youtu.be": "youtube",
+    "tiktok.com": "tiktok",
+    "instagram.com": "instagram",
+    "twitch.tv": "twitch",
+    "x.com": "x",
+    "twitter.com": "x",
+}
+
+_SHORTS_SUFFIX_RE = re.compile(r"\s*[-|•:/]\s*shorts?\s*$", re.IGNORECASE)
+_SHORTS_PAREN_RE = re.compile(r"\s*\(\s*shorts?\s*\)\s*$", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+_TIKTOK_HANDLE_RE = re.compile(r"[a-z0-9._]+")
+_TIKTOK_SEP_RE = re.compile(r"[._]+")
+_SUMMARY_RE = re.compile(r"(\w+)\s*=\s*(\d+)")
 
 TRANSLATIONS: dict[str, dict[str, str]] = {
     "en": {
@@ -293,6 +403,7 @@ TRANSLATIONS["ru"]["settings_cookie_upload_ok"] = "Cookie-файл загруж
 TRANSLATIONS["ru"]["msg_settings_cookie_check_missing"] = "Нет cookie-файла Instagram. Сначала загрузите его."
 TRANSLATIONS["ru"]["msg_settings_cookie_check_ok"] = "Instagram cookie валидны"
 TRANSLATIONS["ru"]["msg_settings_cookie_check_invalid"] = "Проверка cookie не пройдена: {reason}"
+TRANSLATIONS_EN = TRANSLATIONS["en"]
 
 
 @app.on_event("startup")
@@ -300,6 +411,14 @@ def on_startup() -> None:
     init_db()
 
 
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    AVATAR_EXECUTOR.shutdown(wait=True, cancel_futures=True)
+    HTTP_CLIENT.close()
+    shutdown_ytdlp_service()
+    dispose_engine()
+
+
 @app.middleware("http")
 async def telegram_auth_middleware(request: Request, call_next):
     path = request.url.path
@@ -322,37 +441,44 @@ async def telegram_auth_middleware(request: Request, call_next):
     return RedirectResponse(url=redirect_url, status_code=303)
 
 
+def _one_of(value: str | None, allowed: frozenset[str], default: str) -> str:
+    return value if value in allowed else default
+
+
 def _get_lang(request: Request) -> str:
-    lang = (request.cookies.get("lang") or "en").lower()
-    return lang if lang in SUPPORTED_LANGS else "en"
+    lang = request.cookies.get("lang")
+    # The preference routes always store lowercase values; only case-fold on a miss.
+    if lang in SUPPORTED_LANGS:
+        return lang
+    return _one_of((lang or "en").lower(), SUPPORTED_LANGS, "en")
 
 
 def _get_theme(request: Request) -> str:
-    theme = (request.cookies.get("theme") or "light").lower()
-    return theme if theme in SUPPORTED_THEMES else "light"
+    theme = request.cookies.get("theme")
+    if theme in SUPPORTED_THEMES:
+        return theme
+    return _one_of((theme or "light").lower(), SUPPORTED_THEMES, "light")
 
 
 def _safe_section(section: str | None) -> str:
-    if section in SUPPORTED_SECTIONS:
-        return section
-    return "overview"
+    return _one_of(section, SUPPORTED_SECTIONS, "overview")
 
 
 def _safe_video_sort(video_sort: str | None) -> str:
-    if video_sort in SUPPORTED_VIDEO_SORTS:
-        return video_sort
-    return "upload_date"
+    return _one_of(video_sort, SUPPORTED_VIDEO_SORTS, "upload_date")
 
 
 def _safe_video_order(video_order: str | None) -> str:
-    if video_order in SUPPORTED_VIDEO_ORDERS:
-        return video_order
-    return "desc"
+    return _one_of(video_order, SUPPORTED_VIDEO_ORDERS, "desc")
+
+
+@lru_cache(maxsize=4096)
+def _t_plain(lang: str, key: str) -> str:
+    return TRANSLATIONS.get(lang, TRANSLATIONS_EN).get(key, TRANSLATIONS_EN.get(key, key))
 
 
 def _t(lang: str, key: str, **kwargs: Any) -> str:
-    dictionary = TRANSLATIONS.get(lang, TRANSLATIONS["en"])
-    text = dictionary.get(key, TRANSLATIONS["en"].get(key, key))
+    text = _t_plain(lang, key)
     return text.format(**kwargs) if kwargs else text
 
 
@@ -498,9 +624,7 @@ def _dashboard_url(section: str, msg: str | None = None, error: str | None = Non
 def _extract_summary_counts(message: str | None) -> dict[str, int] | None:
     if not message:
         return None
-    import re
-
-    matches = re.findall(r"([A-Za-zА-Яа-яЁё_]+)\s*=\s*(\d+)", message)
+    matches = _SUMMARY_RE.findall(message)
     if not matches:
         return None
 
@@ -514,42 +638,37 @@ def _extract_summary_counts(message: str | None) -> dict[str, int] | None:
 
 
 def _set_refresh_job(job_id: str, **kwargs: Any) -> None:
-    with REFRESH_JOBS_LOCK:
-        job = REFRESH_JOBS.get(job_id)
-        if not job:
-            return
-        job.update(kwargs)
+    job = REFRESH_JOBS.get(job_id)
+    if not job:
+        return
+    # Publish "finished" last so a poller never sees a finished job without its final message.
+    finished = kwargs.pop("finished", None)
+    for key, value in kwargs.items():
+        setattr(job, key, value)
+    if finished is not None:
+        if finished and job.finished_at_mono is None:
+            job.finished_at_mono = time.monotonic_ns()
+        job.finished = finished
+    job.notify()
 
 
 def _is_refresh_job_cancel_requested(job_id: str) -> bool:
-    with REFRESH_JOBS_LOCK:
-        job = REFRESH_JOBS.get(job_id)
-        if not job:
-            return True
-        return bool(job.get("cancel_requested"))
+    job = REFRESH_JOBS.get(job_id)
+    if not job:
+        return True
+    return job.cancel_requested
 
 
 def _cleanup_refresh_jobs() -> None:
-    now = datetime.utcnow()
-    expiry = now - timedelta(hours=REFRESH_JOB_TTL_HOURS)
-
-    def _parse_iso(value: Any) -> datetime | None:
-        if not isinstance(value, str) or not value:
-            return None
-        try:
-            return datetime.fromisoformat(value)
-        except ValueError:
-            return None
+    expiry = time.monotonic_ns() - REFRESH_JOB_TTL_HOURS * 3600 * 1_000_000_000
 
     with REFRESH_JOBS_LOCK:
         stale_ids: list[str] = []
         for job_id, job in REFRESH_JOBS.items():
-            if not job.get("finished"):
+            if not job.finished:
                 continue
-            finished_at = _parse_iso(job.get("finished_at"))
-            started_at = _parse_iso(job.get("started_at"))
-            timestamp = finished_at or started_at
-            if timestamp and timestamp < expiry:
+            timestamp = job.finished_at_mono or job.started_at_mono
+            if timestamp < expiry:
                 stale_ids.append(job_id)
 
         for job_id in stale_ids:
@@ -559,25 +678,41 @@ def _cleanup_refresh_jobs() -> None:
         if overflow <= 0:
             return
 
-        sortable: list[tuple[datetime, str]] = []
+        sortable: list[tuple[int, str]] = []
         for job_id, job in REFRESH_JOBS.items():
-            if not job.get("finished"):
+            if not job.finished:
                 continue
-            finished_at = _parse_iso(job.get("finished_at"))
-            started_at = _parse_iso(job.get("started_at"))
-            timestamp = finished_at or started_at or datetime.min
-            sortable.append((timestamp, job_id))
+            sortable.append((job.finished_at_mono or job.started_at_mono, job_id))
 
-        for _, job_id in sorted(sortable)[:overflow]:
+        for _, job_id in heapq.nsmallest(overflow, sortable):
             REFRESH_JOBS.pop(job_id, None)
 
 
+def _refresh_channel_isolated(
+    channel_id: int,
+    lang: str,
+    force: bool,
+    snapshot_times: dict[int, datetime],
+    job_id: str | None = None,
+) -> tuple[RefreshStatus, str] | None:
+    # Runs on a pool thread, so it needs its own session; None means the job was stopped first.
+    if job_id is not None and _is_refresh_job_cancel_requested(job_id):
+        return None
+    with SessionLocal() as session:
+        channel = session.get(Channel, channel_id)
+        if not channel:
+            return RefreshStatus.FAILED, _t(lang, "msg_channel_not_found")
+        if job_id is not None:
+            _set_refresh_job(job_id, current=channel.title)
+        return _refresh_channel(session, channel, lang=lang, force=force, snapshot_times=snapshot_times)
+
+
 def _run_refresh_all_job(job_id: str, force: bool, lang: str, section: str) -> None:
     try:
-        with Session(engine) as session:
-            channels = session.exec(select(Channel)).all()
-            total = len(channels)
-            _set_refresh_job(job_id, total=total)
+        with SessionLocal() as session:
+            channels, skipped = _load_channels_to_refresh(session, force)
+            total = len(channels) + skipped
+            _set_refresh_job(job_id, total=total, done=skipped, skipped=skipped)
 
             if total == 0:
                 msg = _t(lang, "msg_no_channels_to_refresh")
@@ -597,42 +732,49 @@ def _run_refresh_all_job(job_id: str, force: bool, lang: str, section: str) -> N
                 return
 
             refreshed = 0
-            skipped = 0
             failed = 0
-            done = 0
-
-            for channel in channels:
-                if _is_refresh_job_cancel_requested(job_id):
-                    summary = _t(
-                        lang,
-                        "msg_done_cancelled_summary",
-                        done=done,
-                        total=total,
-                        refreshed=refreshed,
-                        skipped=skipped,
-                        failed=failed,
-                    )
-                    _set_refresh_job(
-                        job_id,
-                        finished=True,
-                        finished_at=datetime.utcnow().isoformat(),
-                        cancelled=True,
-                        current="",
-                        message=summary,
-                        redirect_url=_dashboard_url(section, msg=summary),
-                    )
-                    return
-                _set_refresh_job(job_id, current=channel.title, done=done)
-                ok, text = _refresh_channel(session, channel, lang=lang, force=force)
-                if ok and text == _t(lang, "msg_skipped_cache"):
-                    skipped += 1
-                elif ok:
-                    refreshed += 1
-                else:
-                    failed += 1
-                done += 1
-                _set_refresh_job(job_id, done=done, refreshed=refreshed, skipped=skipped, failed=failed)
+            done = skipped
+            snapshot_times = _load_latest_snapshot_times(session, [channel.id for channel in channels])
 
+            with ThreadPoolExecutor(max_workers=REFRESH_ALL_MAX_WORKERS) as executor:
+                futures = [
+                    executor.submit(_refresh_channel_isolated, channel.id, lang, force, snapshot_times, job_id)
+                    for channel in channels
+                ]
+                for future in as_completed(futures):
+                    result = future.result()
+                    if result is None:
+                        continue
+                    status, _ = result
+                    if status is RefreshStatus.SKIPPED:
+                        skipped += 1
+                    elif status is RefreshStatus.REFRESHED:
+                        refreshed += 1
+                    else:
+                        failed += 1
+                    done += 1
+                    _set_refresh_job(job_id, done=done, refreshed=refreshed, skipped=skipped, failed=failed)
+
+            if done < total:
+                summary = _t(
+                    lang,
+                    "msg_done_cancelled_summary",
+                    done=done,
+                    total=total,
+                    refreshed=refreshed,
+                    skipped=skipped,
+                    failed=failed,
+                )
+                _set_refresh_job(
+                    job_id,
+                    finished=True,
+                    finished_at=datetime.utcnow().isoformat(),
+                    cancelled=True,
+                    current="",
+                    message=summary,
+                    redirect_url=_dashboard_url(section, msg=summary),
+                )
+                return
             summary = _t(lang, "msg_done_summary", refreshed=refreshed, skipped=skipped, failed=failed)
             _set_refresh_job(
                 job_id,
@@ -656,20 +798,39 @@ def _run_refresh_all_job(job_id: str, force: bool, lang: str, section: str) -> N
 
 def _save_instagram_cookie_file(upload: UploadFile) -> str:
     COOKIE_STORE_DIR.mkdir(parents=True, exist_ok=True)
-    data = upload.file.read()
-    if not data:
+    partial = COOKIE_STORE_FILE.with_name(f"{COOKIE_STORE_FILE.name}.part")
+    with partial.open("wb") as out:
+        shutil.copyfileobj(upload.file, out, length=STREAM_CHUNK_SIZE)
+    if partial.stat().st_size == 0:
+        partial.unlink(missing_ok=True)
         raise ValueError("empty file")
-    COOKIE_STORE_FILE.write_bytes(data)
+    partial.replace(COOKIE_STORE_FILE)
+    _clear_instagram_cookie_file_cache()
     return str(COOKIE_STORE_FILE)
 
 
+def _clear_instagram_cookie_file_cache() -> None:
+    global _cookie_file_cache
+    _cookie_file_cache = None
+
+
 def _effective_instagram_cookie_file() -> str:
-    if COOKIE_STORE_FILE.is_file():
-        return str(COOKIE_STORE_FILE)
+    # Refresh fan-outs and the settings page call this repeatedly; reuse the stat() result briefly.
+    global _cookie_file_cache
     configured = (settings.instagram_cookie_file or "").strip()
-    if configured and Path(configured).is_file():
-        return configured
-    return ""
+    now = time.monotonic()
+    cached = _cookie_file_cache
+    if cached is not None and cached[0] > now and cached[1] == configured:
+        return cached[2]
+
+    if COOKIE_STORE_FILE.is_file():
+        resolved = str(COOKIE_STORE_FILE)
+    elif configured and Path(configured).is_file():
+        resolved = configured
+    else:
+        resolved = ""
+    _cookie_file_cache = (now + COOKIE_FILE_CACHE_TTL_SECONDS, configured, resolved)
+    return resolved
 
 
 def _check_instagram_cookies(cookie_file: str) -> tuple[bool, str]:
@@ -685,27 +846,33 @@ def _check_instagram_cookies(cookie_file: str) -> tuple[bool, str]:
     if len(list(jar)) == 0:
         return False, "cookie file is empty"
 
-    req = urllib.request.Request(
-        "https://www.instagram.com/accounts/edit/",
-        headers={
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/124.0.0.0 Safari/537.36"
-            ),
-            "Accept-Language": "en-US,en;q=0.9",
-            "Referer": "https://www.instagram.com/",
-        },
-    )
-    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    headers = {
+        "User-Agent": BROWSER_USER_AGENT,
+        "Accept-Language": "en-US,en;q=0.9",
+        "Referer": "https://www.instagram.com/",
+    }
+    # A dedicated client keeps the Instagram session cookies out of the shared pool's jar.
     try:
-        with opener.open(req, timeout=20) as resp:
-            final_url = (resp.geturl() or "").lower()
-            html = resp.read(30000).decode("utf-8", errors="ignore").lower()
-            if "/accounts/login" in final_url or "loginform" in html:
-                return False, "session is not authorized"
-    except urllib.error.HTTPError as exc:
-        return False, f"http {exc.code}"
+        with httpx.Client(cookies=jar, headers=headers, timeout=20, follow_redirects=True) as client:
+            with client.stream("GET", "https://www.instagram.com/accounts/edit/") as resp:
+                resp.raise_for_status()
+                if "/accounts/login" in str(resp.url).lower():
+                    return False, "session is not authorized"
+                # Scan the first 30 KB as lowercased bytes, keeping a small tail so a marker split
+                # across chunks is still found, and stop as soon as the login form shows up.
+                scanned = 0
+                tail = b""
+                for chunk in resp.iter_bytes():
+                    chunk = chunk[: 30000 - scanned].lower()
+                    scanned += len(chunk)
+                    window = tail + chunk
+                    if b"loginform" in window:
+                        return False, "session is not authorized"
+                    if scanned >= 30000:
+                        break
+                    tail = window[-8:]
+    except httpx.HTTPStatusError as exc:
+        return False, f"http {exc.response.status_code}"
     except Exception as exc:
         return False, str(exc)
 
@@ -715,97 +882,164 @@ def _check_instagram_cookies(cookie_file: str) -> tuple[bool, str]:
 def _cache_avatar_locally(channel_id: int, avatar_url: str | None) -> str | None:
     if not avatar_url:
         return None
+    partial: Path | None = None
     try:
-        req = urllib.request.Request(
-            avatar_url,
-            headers={
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/124.0.0.0 Safari/537.36"
-                ),
-                "Accept": "image/*,*/*;q=0.8",
-            },
-        )
-        with urllib.request.urlopen(req, timeout=20) as resp:
-            body = resp.read()
+        with HTTP_CLIENT.stream("GET", avatar_url, headers={"Accept": "image/*,*/*;q=0.8"}) as resp:
+            resp.raise_for_status()
             content_type = (resp.headers.get("Content-Type") or "").lower()
+            if "image/png" in content_type:
+                ext = ".png"
+            elif "image/webp" in content_type:
+                ext = ".webp"
+            elif "image/gif" in content_type:
+                ext = ".gif"
+            else:
+                ext = ".jpg"
+
+            AVATAR_STORE_DIR.mkdir(parents=True, exist_ok=True)
+            target = AVATAR_STORE_DIR / f"channel_{channel_id}{ext}"
+            partial = target.with_name(f"{target.name}.part")
+            with partial.open("wb") as out:
+                for chunk in resp.iter_bytes(STREAM_CHUNK_SIZE):
+                    out.write(chunk)
     except Exception:
+        if partial is not None:
+            partial.unlink(missing_ok=True)
         return avatar_url
 
-    if not body:
+    if partial.stat().st_size == 0:
+        partial.unlink(missing_ok=True)
         return avatar_url
+    partial.replace(target)
+    return f"/static/avatars/{target.name}"
 
-    if "image/png" in content_type:
-        ext = ".png"
-    elif "image/webp" in content_type:
-        ext = ".webp"
-    elif "image/gif" in content_type:
-        ext = ".gif"
-    else:
-        ext = ".jpg"
 
-    AVATAR_STORE_DIR.mkdir(parents=True, exist_ok=True)
-    target = AVATAR_STORE_DIR / f"channel_{channel_id}{ext}"
-    target.write_bytes(body)
-    return f"/static/avatars/{target.name}"
+def _cache_avatar_in_background(channel_id: int, avatar_url: str) -> None:
+    cached_avatar_url = _cache_avatar_locally(channel_id, avatar_url)
+    if not cached_avatar_url or cached_avatar_url == avatar_url:
+        return
+    with SessionLocal() as session:
+        channel = session.get(Channel, channel_id)
+        if channel and channel.avatar_url != cached_avatar_url:
+            channel.avatar_url = cached_avatar_url
+            session.add(channel)
+            session.commit()
 
 
+@lru_cache(maxsize=1024)
 def _detect_platform(url: str) -> str:
-    host = (urlparse(url).netloc or "").lower()
-    if "youtube.com" in host or "youtu.be" in host:
-        return "youtube"
-    if "tiktok.com" in host:
-        return "tiktok"
-    if "instagram.com" in host:
-        return "instagram"
-    if "twitch.tv" in host:
-        return "twitch"
-    if "x.com" in host or "twitter.com" in host:
-        return "x"
+    try:
+        host = urlparse(url).hostname or ""
+    except ValueError:
+        return "other"
+    labels = host.split(".")
+    # Try the full host first, then drop subdomains until a known domain matches.
+    for start in range(len(labels) - 1):
+        platform = _PLATFORM_BY_DOMAIN.get(".".join(labels[start:]))
+        if platform:
+            return platform
     return "other"
 
 
 def _display_channel_title(channel: Channel) -> str:
-    raw = (channel.title or "").strip()
+    return _display_title_for(channel.title or "", channel.url or "")
+
+
+@lru_cache(maxsize=1024)
+def _display_title_for(title: str, url: str) -> str:
+    raw = title.strip()
     if not raw:
         return "Untitled channel"
 
-    platform = _detect_platform(channel.url or "")
+    platform = _detect_platform(url)
     if platform != "tiktok":
         return raw
 
     normalized = raw[1:] if raw.startswith("@") else raw
     # TikTok often returns handle-like names; convert to a readable label.
-    if re.fullmatch(r"[a-z0-9._]+", normalized):
-        normalized = re.sub(r"[._]+", " ", normalized)
-        normalized = re.sub(r"\s+", " ", normalized).strip()
+    if _TIKTOK_HANDLE_RE.fullmatch(normalized):
+        normalized = _TIKTOK_SEP_RE.sub(" ", normalized)
+        normalized = _WS_RE.sub(" ", normalized).strip()
         if normalized:
             return normalized.title()
     return raw
 
 
+@lru_cache(maxsize=1024)
 def _clean_channel_title_for_strip(title: str) -> str:
     if not title:
         return title
     cleaned = title.strip()
-    cleaned = re.sub(r"\s*[-|•:/]\s*shorts?\s*$", "", cleaned, flags=re.IGNORECASE)
-    cleaned = re.sub(r"\s*\(\s*shorts?\s*\)\s*$", "", cleaned, flags=re.IGNORECASE)
-    cleaned = re.sub(r"\s+", " ", cleaned).strip()
+    cleaned = _SHORTS_SUFFIX_RE.sub("", cleaned)
+    cleaned = _SHORTS_PAREN_RE.sub("", cleaned)
+    cleaned = _WS_RE.sub(" ", cleaned).strip()
     return cleaned or title
 
 
+# Missing values sort above every real one (last ascending, first descending), as before.
+_MISSING_COUNT = float("inf")
+_VIDEO_SORT_KEYS = {
+    "title": lambda v: (v.title or "").lower(),
+    "views": lambda v: _MISSING_COUNT if v.view_count is None else v.view_count,
+    "likes": lambda v: _MISSING_COUNT if v.like_count is None else v.like_count,
+    "comments": lambda v: _MISSING_COUNT if v.comment_count is None else v.comment_count,
+    "upload_date": lambda v: date.max if v.upload_date is None else v.upload_date,
+}
+
+
 def _sort_videos(videos: list[Video], sort_key: str, sort_order: str) -> list[Video]:
-    reverse = sort_order == "desc"
-    if sort_key == "title":
-        return sorted(videos, key=lambda v: (v.title or "").lower(), reverse=reverse)
-    if sort_key == "views":
-        return sorted(videos, key=lambda v: (v.view_count is None, v.view_count or 0), reverse=reverse)
-    if sort_key == "likes":
-        return sorted(videos, key=lambda v: (v.like_count is None, v.like_count or 0), reverse=reverse)
-    if sort_key == "comments":
-        return sorted(videos, key=lambda v: (v.comment_count is None, v.comment_count or 0), reverse=reverse)
-    return sorted(videos, key=lambda v: (v.upload_date is None, v.upload_date), reverse=reverse)
+    key = _VIDEO_SORT_KEYS.get(sort_key, _VIDEO_SORT_KEYS["upload_date"])
+    return sorted(videos, key=key, reverse=sort_order == "desc")
+
+
+# Title stays a Python sort: SQLite's lower() only folds ASCII, which would misorder Cyrillic titles.
+_VIDEO_SORT_COLUMNS = {
+    "views": Video.view_count,
+    "likes": Video.like_count,
+    "comments": Video.comment_count,
+    "upload_date": Video.upload_date,
+}
+
+
+# Newest first; same-day and undated videos keep the order of the latest fetched feed.
+_VIDEO_FEED_ORDER = (Video.upload_date.desc(), Video.feed_position.desc(), Video.id.desc())
+
+
+def _select_channel_videos(channel_ids: list[int], sort_key: str, sort_order: str):
+    # Latest max_videos_per_channel videos of every channel in one pass.
+    ranked = (
+        select(
+            Video.id,
+            func.row_number()
+            .over(partition_by=Video.channel_id, order_by=_VIDEO_FEED_ORDER)
+            .label("rn"),
+        )
+        .where(Video.channel_id.in_(channel_ids))
+        .subquery()
+    )
+    # Only the columns the dashboard renders; rows are read by attribute like Video objects.
+    query = (
+        select(
+            Video.channel_id,
+            Video.title,
+            Video.url,
+            Video.upload_date,
+            Video.view_count,
+            Video.like_count,
+            Video.comment_count,
+            Video.view_delta,
+            Video.like_delta,
+            Video.comment_delta,
+            Video.thumbnail_url,
+        )
+        .join(ranked, ranked.c.id == Video.id)
+        .where(ranked.c.rn <= settings.max_videos_per_channel)
+    )
+    column = _VIDEO_SORT_COLUMNS.get(sort_key)
+    if column is not None:
+        # Same placement of missing values as _sort_videos: last ascending, first descending.
+        query = query.order_by(column.desc().nulls_first() if sort_order == "desc" else column.asc().nulls_last())
+    return query.order_by(*_VIDEO_FEED_ORDER)
 
 
 def _is_cache_valid(channel: Channel, force: bool) -> bool:
@@ -817,47 +1051,94 @@ def _is_cache_valid(channel: Channel, force: bool) -> bool:
     return delta < timedelta(hours=settings.refresh_interval_hours)
 
 
-def _aggregate_for_channel(session: Session, channel_id: int) -> dict[str, Any]:
-    totals = session.exec(
-        select(
-            func.coalesce(func.sum(Video.view_count), 0),
-            func.coalesce(func.avg(Video.view_count), 0),
-            func.coalesce(func.sum(Video.like_count), 0),
-            func.coalesce(func.sum(Video.comment_count), 0),
-        ).where(Video.channel_id == channel_id)
-    ).one()
-    total_views = int(totals[0] or 0)
-    avg_views = int(float(totals[1] or 0.0))
-    total_likes = int(totals[2] or 0)
-    total_comments = int(totals[3] or 0)
-
-    view_values = [
-        int(value)
-        for value in session.exec(select(Video.view_count).where(Video.channel_id == channel_id)).all()
-        if value is not None
-    ]
-    view_values.sort()
-    count = len(view_values)
-    if count == 0:
-        median_views = 0
-        top_video_views = 0
-    elif count % 2 == 1:
-        median_views = view_values[count // 2]
-        top_video_views = view_values[-1]
-    else:
-        median_views = int((view_values[count // 2 - 1] + view_values[count // 2]) / 2)
-        top_video_views = view_values[-1]
+def _load_channels_to_refresh(session: Session, force: bool) -> tuple[list[Channel], int]:
+    total = session.exec(select(func.count()).select_from(Channel)).one()
+    query = select(Channel)
+    if not force:
+        cutoff = datetime.utcnow() - timedelta(hours=settings.refresh_interval_hours)
+        query = query.where(or_(Channel.last_refreshed_at.is_(None), Channel.last_refreshed_at <= cutoff))
+    channels = list(session.exec(query).all())
+    return channels, total - len(channels)
+
 
+def _empty_aggregates() -> dict[str, Any]:
     return {
-        "total_views": total_views,
-        "avg_views": avg_views,
-        "total_likes": total_likes,
-        "total_comments": total_comments,
-        "median_views": median_views,
-        "top_video_views": top_video_views,
+        "total_views": 0,
+        "avg_views": 0,
+        "total_likes": 0,
+        "total_comments": 0,
+        "median_views": 0,
+        "top_video_views": 0,
     }
 
 
+def _aggregate_for_channels(session: Session, channel_ids: list[int]) -> dict[int, dict[str, Any]]:
+    if not channel_ids:
+        return {}
+    use_percentile = session.get_bind().dialect.name == "postgresql"
+    columns = [
+        Video.channel_id,
+        func.coalesce(func.sum(Video.view_count), 0).label("total_views"),
+        func.coalesce(func.avg(Video.view_count), 0).label("avg_views"),
+        func.coalesce(func.sum(Video.like_count), 0).label("total_likes"),
+        func.coalesce(func.sum(Video.comment_count), 0).label("total_comments"),
+        func.coalesce(func.max(Video.view_count), 0).label("top_video_views"),
+    ]
+    if use_percentile:
+        columns.append(func.percentile_cont(0.5).within_group(Video.view_count).label("median_views"))
+    totals_rows = session.exec(
+        select(*columns).where(Video.channel_id.in_(channel_ids)).group_by(Video.channel_id)
+    ).all()
+
+    medians: dict[int, int] = {}
+    if use_percentile:
+        medians = {row.channel_id: int(row.median_views) for row in totals_rows if row.median_views is not None}
+    else:
+        # Rank non-null view counts per channel and keep only the one or two middle rows.
+        ranked = (
+            select(
+                Video.channel_id,
+                Video.view_count,
+                func.row_number().over(partition_by=Video.channel_id, order_by=Video.view_count).label("rn"),
+                func.count().over(partition_by=Video.channel_id).label("cnt"),
+            )
+            .where(Video.channel_id.in_(channel_ids))
+            .where(Video.view_count.is_not(None))
+            .subquery()
+        )
+        middle_values: dict[int, list[int]] = {}
+        for channel_id, view_count in session.exec(
+            select(ranked.c.channel_id, ranked.c.view_count)
+            .where(ranked.c.rn * 2 >= ranked.c.cnt)
+            .where(ranked.c.rn * 2 <= ranked.c.cnt + 2)
+        ).all():
+            middle_values.setdefault(channel_id, []).append(int(view_count))
+        medians = {channel_id: int(sum(values) / len(values)) for channel_id, values in middle_values.items()}
+
+    aggregates: dict[int, dict[str, Any]] = {}
+    for row in totals_rows:
+        aggregates[row.channel_id] = {
+            "total_views": int(row.total_views or 0),
+            "avg_views": int(float(row.avg_views or 0.0)),
+            "total_likes": int(row.total_likes or 0),
+            "total_comments": int(row.total_comments or 0),
+            "median_views": medians.get(row.channel_id, 0),
+            "top_video_views": int(row.top_video_views or 0),
+        }
+    return aggregates
+
+
+def _load_latest_snapshot_times(session: Session, channel_ids: list[int]) -> dict[int, datetime]:
+    if not channel_ids:
+        return {}
+    rows = session.exec(
+        select(ChannelSnapshot.channel_id, func.max(ChannelSnapshot.captured_at))
+        .where(ChannelSnapshot.channel_id.in_(channel_ids))
+        .group_by(ChannelSnapshot.channel_id)
+    ).all()
+    return {channel_id: captured_at for channel_id, captured_at in rows if captured_at is not None}
+
+
 def _save_channel_snapshot(
     session: Session,
     channel_id: int,
@@ -865,17 +1146,15 @@ def _save_channel_snapshot(
     total_likes: int,
     total_comments: int,
     subscriber_count: int | None,
+    snapshot_times: dict[int, datetime],
+    now: datetime | None = None,
 ) -> None:
-    now = datetime.utcnow()
-    latest = session.exec(
-        select(ChannelSnapshot)
-        .where(ChannelSnapshot.channel_id == channel_id)
-        .order_by(ChannelSnapshot.captured_at.desc(), ChannelSnapshot.id.desc())
-        .limit(1)
-    ).first()
-    if latest and (now - latest.captured_at) < timedelta(hours=24):
+    now = now or datetime.utcnow()
+    latest_captured_at = snapshot_times.get(channel_id)
+    if latest_captured_at and (now - latest_captured_at) < timedelta(hours=24):
         return
 
+    # Added to the caller's session so the snapshot commits, or rolls back, with the channel's own update.
     session.add(
         ChannelSnapshot(
             channel_id=channel_id,
@@ -886,29 +1165,49 @@ def _save_channel_snapshot(
             subscriber_count=subscriber_count,
         )
     )
+    snapshot_times[channel_id] = now
 
 
-def _build_channel_24h_stats(
+def _load_24h_baselines(
     session: Session,
+    channel_ids: list[int],
+    threshold: datetime,
+) -> dict[int, ChannelSnapshot]:
+    if not channel_ids:
+        return {}
+    ranked = (
+        select(
+            ChannelSnapshot.id,
+            func.row_number()
+            .over(
+                partition_by=ChannelSnapshot.channel_id,
+                order_by=(ChannelSnapshot.captured_at.desc(), ChannelSnapshot.id.desc()),
+            )
+            .label("rn"),
+        )
+        .where(ChannelSnapshot.channel_id.in_(channel_ids))
+        .where(ChannelSnapshot.captured_at <= threshold)
+        .subquery()
+    )
+    snapshots = session.exec(
+        select(ChannelSnapshot).join(ranked, ranked.c.id == ChannelSnapshot.id).where(ranked.c.rn == 1)
+    ).all()
+    return {snapshot.channel_id: snapshot for snapshot in snapshots}
+
+
+def _build_channel_24h_stats(
     channel: Channel,
     aggregates: dict[str, Any],
+    baseline: ChannelSnapshot | None,
+    platform: str,
+    display_title: str,
 ) -> dict[str, Any]:
-    platform = _detect_platform(channel.url)
-    display_title = _display_channel_title(channel)
-    threshold = datetime.utcnow() - timedelta(hours=24)
-    baseline = session.exec(
-        select(ChannelSnapshot)
-        .where(ChannelSnapshot.channel_id == channel.id)
-        .where(ChannelSnapshot.captured_at <= threshold)
-        .order_by(ChannelSnapshot.captured_at.desc(), ChannelSnapshot.id.desc())
-        .limit(1)
-    ).first()
-
+    strip_title = _clean_channel_title_for_strip(display_title)
     if not baseline:
         return {
             "channel": channel,
             "platform": platform,
-            "display_title": _clean_channel_title_for_strip(display_title),
+            "display_title": strip_title,
             "has_delta": False,
             "views_delta": None,
             "likes_delta": None,
@@ -923,7 +1222,7 @@ def _build_channel_24h_stats(
     return {
         "channel": channel,
         "platform": platform,
-        "display_title": _clean_channel_title_for_strip(display_title),
+        "display_title": strip_title,
         "has_delta": True,
         "views_delta": aggregates["total_views"] - baseline.total_views,
         "likes_delta": aggregates["total_likes"] - baseline.total_likes,
@@ -932,17 +1231,40 @@ def _build_channel_24h_stats(
     }
 
 
-def _refresh_channel(session: Session, channel: Channel, lang: str, force: bool = False) -> tuple[bool, str]:
+def _refresh_channel(
+    session: Session,
+    channel: Channel,
+    lang: str,
+    force: bool = False,
+    snapshot_times: dict[int, datetime] | None = None,
+) -> tuple[RefreshStatus, str]:
     if _is_cache_valid(channel, force=force):
-        return True, _t(lang, "msg_skipped_cache")
+        return RefreshStatus.SKIPPED, _t(lang, "msg_skipped_cache")
 
-    existing_videos = session.exec(select(Video).where(Video.channel_id == channel.id)).all()
+    # Only the columns that are carried over per URL; totals come from the aggregate query below.
+    existing_videos = session.exec(
+        select(
+            Video.id,
+            Video.url,
+            Video.title,
+            Video.upload_date,
+            Video.duration_seconds,
+            Video.view_count,
+            Video.like_count,
+            Video.comment_count,
+            Video.thumbnail_url,
+        ).where(Video.channel_id == channel.id)
+    ).all()
     existing_by_url = {video.url: video for video in existing_videos if video.url}
+    reusable_ids = {url: video.id for url, video in existing_by_url.items()}
     has_previous = len(existing_videos) > 0
-    old_total_views = sum(int(video.view_count or 0) for video in existing_videos)
-    old_total_likes = sum(int(video.like_count or 0) for video in existing_videos)
-    old_total_comments = sum(int(video.comment_count or 0) for video in existing_videos)
-    old_view_values = sorted(int(video.view_count or 0) for video in existing_videos if video.view_count is not None)
+    old_aggregates = _aggregate_for_channels(session, [channel.id]).get(channel.id) or _empty_aggregates()
+    old_total_views = old_aggregates["total_views"]
+    old_total_likes = old_aggregates["total_likes"]
+    old_total_comments = old_aggregates["total_comments"]
+    old_avg_views = old_aggregates["avg_views"]
+    old_median_views = old_aggregates["median_views"]
+    old_top_video_views = old_aggregates["top_video_views"]
 
     def _view_stats(values: list[int]) -> tuple[int, int, int]:
         if not values:
@@ -955,8 +1277,6 @@ def _refresh_channel(session: Session, channel: Channel, lang: str, force: bool
             median = int((values[len(values) // 2 - 1] + values[len(values) // 2]) / 2)
         return avg, median, top
 
-    old_avg_views, old_median_views, old_top_video_views = _view_stats(old_view_values)
-
     try:
         payload = fetch_channel_data(
             channel.url,
@@ -967,34 +1287,38 @@ def _refresh_channel(session: Session, channel: Channel, lang: str, force: bool
         channel.last_error = str(exc)
         session.add(channel)
         session.commit()
-        return False, channel.last_error
+        return RefreshStatus.FAILED, channel.last_error
     except Exception as exc:
         channel.last_error = f"Unexpected fetch error: {exc}"
         session.add(channel)
         session.commit()
-        return False, channel.last_error
+        return RefreshStatus.FAILED, channel.last_error
 
     if existing_videos and not payload.videos:
         channel.last_error = _t(lang, "msg_refresh_kept_old")
         session.add(channel)
         session.commit()
-        return False, channel.last_error
+        return RefreshStatus.FAILED, channel.last_error
 
     try:
-        cached_avatar_url = _cache_avatar_locally(channel.id, payload.avatar_url)
+        # One timestamp for the channel, its videos and its snapshot so they line up exactly.
+        now = datetime.utcnow()
         channel.title = payload.title or channel.title
         channel.url = payload.url or channel.url
-        channel.avatar_url = cached_avatar_url or payload.avatar_url or channel.avatar_url
+        # Keep an already cached local avatar; the background download rewrites the file in place.
+        if not (channel.avatar_url or "").startswith("/static/avatars/"):
+            channel.avatar_url = payload.avatar_url or channel.avatar_url
         channel.subscriber_count = payload.subscriber_count if payload.subscriber_count is not None else channel.subscriber_count
-        channel.last_refreshed_at = datetime.utcnow()
+        channel.last_refreshed_at = now
         channel.last_error = None
 
         total_views = 0
         total_likes = 0
         total_comments = 0
         new_view_values: list[int] = []
-        session.exec(delete(Video).where(Video.channel_id == channel.id))
-        for item in payload.videos:
+        video_rows: list[dict[str, Any]] = []
+        updated_rows: list[dict[str, Any]] = []
+        for feed_position, item in enumerate(payload.videos):
             old_video = existing_by_url.get(item.url)
             upload_date = item.upload_date or (old_video.upload_date if old_video else None)
             duration_seconds = item.duration_seconds or (old_video.duration_seconds if old_video else None)
@@ -1020,22 +1344,40 @@ def _refresh_channel(session: Session, channel: Channel, lang: str, force: bool
             if old_video and old_video.comment_count is not None and comment_count is not None:
                 comment_delta = int(comment_count) - int(old_video.comment_count)
 
-            session.add(
-                Video(
-                    channel_id=channel.id,
-                    title=title,
-                    url=item.url,
-                    upload_date=upload_date,
-                    duration_seconds=duration_seconds,
-                    view_count=view_count,
-                    like_count=like_count,
-                    comment_count=comment_count,
-                    view_delta=view_delta,
-                    like_delta=like_delta,
-                    comment_delta=comment_delta,
-                    thumbnail_url=thumbnail_url,
-                )
-            )
+            row = {
+                "channel_id": channel.id,
+                "title": title,
+                "url": item.url,
+                "upload_date": upload_date,
+                "duration_seconds": duration_seconds,
+                "view_count": view_count,
+                "like_count": like_count,
+                "comment_count": comment_count,
+                "view_delta": view_delta,
+                "like_delta": like_delta,
+                "comment_delta": comment_delta,
+                "thumbnail_url": thumbnail_url,
+                "feed_position": feed_position,
+                "extracted_at": now,
+            }
+            video_id = reusable_ids.pop(item.url, None)
+            if video_id is None:
+                video_rows.append(row)
+            else:
+                row["id"] = video_id
+                updated_rows.append(row)
+
+        # Rows for URLs that are still listed are updated in place; only dropped URLs are deleted.
+        kept_ids = {row["id"] for row in updated_rows}
+        stale_ids = [video.id for video in existing_videos if video.id not in kept_ids]
+        if stale_ids:
+            session.exec(delete(Video).where(Video.id.in_(stale_ids)))
+        if updated_rows:
+            # ORM bulk UPDATE by primary key: one executemany statement for all matched rows.
+            session.execute(update(Video), updated_rows)
+        if video_rows:
+            # One executemany INSERT; every row carries the same keys so the statement is reused.
+            session.execute(insert(Video), video_rows)
 
         new_view_values.sort()
         new_avg_views, new_median_views, new_top_video_views = _view_stats(new_view_values)
@@ -1054,6 +1396,8 @@ def _refresh_channel(session: Session, channel: Channel, lang: str, force: bool
             channel.delta_total_likes = None
             channel.delta_total_comments = None
 
+        if snapshot_times is None:
+            snapshot_times = _load_latest_snapshot_times(session, [channel.id])
         _save_channel_snapshot(
             session=session,
             channel_id=channel.id,
@@ -1061,6 +1405,8 @@ def _refresh_channel(session: Session, channel: Channel, lang: str, force: bool
             total_likes=total_likes,
             total_comments=total_comments,
             subscriber_count=payload.subscriber_count,
+            snapshot_times=snapshot_times,
+            now=now,
         )
         session.add(channel)
         session.commit()
@@ -1069,9 +1415,35 @@ def _refresh_channel(session: Session, channel: Channel, lang: str, force: bool
         channel.last_error = f"Unexpected refresh error: {exc}"
         session.add(channel)
         session.commit()
-        return False, channel.last_error
+        return RefreshStatus.FAILED, channel.last_error
+
+    if payload.avatar_url:
+        # Submitted after the commit so the worker's avatar_url update cannot be overwritten by it.
+        AVATAR_EXECUTOR.submit(_cache_avatar_in_background, channel.id, payload.avatar_url)
+    return RefreshStatus.REFRESHED, _t(lang, "msg_refreshed_channel", title=channel.title, count=len(payload.videos))
 
-    return True, _t(lang, "msg_refreshed_channel", title=channel.title, count=len(payload.videos))
+
+_GROUP_SUMMARY_FIELDS = (
+    ("views", "total_views", "views_delta", "delta_total_views"),
+    ("likes", "total_likes", "likes_delta", "delta_total_likes"),
+    ("comments", "total_comments", "comments_delta", "delta_total_comments"),
+)
+
+
+def _summarize_group(rows: list[dict[str, Any]]) -> dict[str, int | None]:
+    # Single pass over the group; a delta stays None unless at least one channel has one.
+    summary: dict[str, int | None] = {}
+    for total_key, _, delta_key, _ in _GROUP_SUMMARY_FIELDS:
+        summary[total_key] = 0
+        summary[delta_key] = None
+    for row in rows:
+        aggregates = row["aggregates"]
+        for total_key, aggregate_key, delta_key, aggregate_delta_key in _GROUP_SUMMARY_FIELDS:
+            summary[total_key] += int(aggregates[aggregate_key])
+            delta = aggregates[aggregate_delta_key]
+            if delta is not None:
+                summary[delta_key] = (summary[delta_key] or 0) + int(delta)
+    return summary
 
 
 @app.get("/")
@@ -1154,7 +1526,7 @@ def logout(request: Request, next: str | None = None):
 @app.get("/preferences/lang/{lang_code}")
 def set_language(lang_code: str, next: str | None = None):
     lang = lang_code.lower()
-    selected = lang if lang in SUPPORTED_LANGS else "en"
+    selected = _one_of(lang, SUPPORTED_LANGS, "en")
     response = RedirectResponse(url=_safe_next(next), status_code=303)
     response.set_cookie("lang", selected, max_age=60 * 60 * 24 * 365, samesite="lax")
     return response
@@ -1163,7 +1535,7 @@ def set_language(lang_code: str, next: str | None = None):
 @app.get("/preferences/theme/{theme_code}")
 def set_theme(theme_code: str, next: str | None = None):
     theme = theme_code.lower()
-    selected = theme if theme in SUPPORTED_THEMES else "light"
+    selected = _one_of(theme, SUPPORTED_THEMES, "light")
     response = RedirectResponse(url=_safe_next(next), status_code=303)
     response.set_cookie("theme", selected, max_age=60 * 60 * 24 * 365, samesite="lax")
     return response
@@ -1188,17 +1560,22 @@ def dashboard(
     channels = session.exec(select(Channel).order_by(Channel.created_at.desc())).all()
     dashboard_rows: list[dict[str, Any]] = []
     channel_24h_rows: list[dict[str, Any]] = []
+    channel_ids = [channel.id for channel in channels if channel.id is not None]
+    aggregates_by_channel = _aggregate_for_channels(session, channel_ids)
+    videos_by_channel: dict[int, list[Any]] = {}
+    if channel_ids:
+        for video in session.exec(_select_channel_videos(channel_ids, current_video_sort, current_video_order)).all():
+            videos_by_channel.setdefault(video.channel_id, []).append(video)
+    now = datetime.utcnow()
+    baselines = _load_24h_baselines(session, channel_ids, now - timedelta(hours=24))
 
     for channel in channels:
         display_title = _display_channel_title(channel)
-        videos = session.exec(
-            select(Video)
-            .where(Video.channel_id == channel.id)
-            .order_by(Video.upload_date.desc(), Video.id.desc())
-            .limit(settings.max_videos_per_channel)
-        ).all()
-        videos = _sort_videos(videos, current_video_sort, current_video_order)
-        aggregates = _aggregate_for_channel(session, channel.id)
+        platform = _detect_platform(channel.url or "")
+        videos = videos_by_channel.get(channel.id, [])
+        if current_video_sort not in _VIDEO_SORT_COLUMNS:
+            videos = _sort_videos(videos, current_video_sort, current_video_order)
+        aggregates = aggregates_by_channel.get(channel.id) or _empty_aggregates()
         aggregates["delta_total_views"] = channel.delta_total_views
         aggregates["delta_avg_views"] = channel.delta_avg_views
         aggregates["delta_median_views"] = channel.delta_median_views
@@ -1211,15 +1588,16 @@ def dashboard(
                 "display_title": display_title,
                 "videos": videos,
                 "aggregates": aggregates,
-                "platform": _detect_platform(channel.url),
+                "platform": platform,
             }
         )
-        channel_24h_rows.append(_build_channel_24h_stats(session, channel, aggregates))
+        channel_24h_rows.append(
+            _build_channel_24h_stats(channel, aggregates, baselines.get(channel.id), platform, display_title)
+        )
 
-    platform_rank = {name: idx for idx, name in enumerate(PLATFORM_ORDER)}
     channel_24h_rows.sort(
         key=lambda row: (
-            platform_rank.get(row["platform"], len(PLATFORM_ORDER)),
+            PLATFORM_RANK.get(row["platform"], len(PLATFORM_ORDER)),
             (row["channel"].title or "").lower(),
         )
     )
@@ -1232,38 +1610,13 @@ def dashboard(
     for platform_key in PLATFORM_ORDER:
         rows = grouped_map.get(platform_key, [])
         if rows:
-            group_views = sum(int(item["aggregates"]["total_views"]) for item in rows)
-            group_likes = sum(int(item["aggregates"]["total_likes"]) for item in rows)
-            group_comments = sum(int(item["aggregates"]["total_comments"]) for item in rows)
-            group_views_deltas = [
-                int(item["aggregates"]["delta_total_views"])
-                for item in rows
-                if item["aggregates"]["delta_total_views"] is not None
-            ]
-            group_likes_deltas = [
-                int(item["aggregates"]["delta_total_likes"])
-                for item in rows
-                if item["aggregates"]["delta_total_likes"] is not None
-            ]
-            group_comments_deltas = [
-                int(item["aggregates"]["delta_total_comments"])
-                for item in rows
-                if item["aggregates"]["delta_total_comments"] is not None
-            ]
             grouped_rows.append(
                 {
                     "key": platform_key,
                     "label": _t(lang, f"platform_{platform_key}"),
                     "rows": rows,
                     "channel_count": len(rows),
-                    "summary": {
-                        "views": group_views,
-                        "likes": group_likes,
-                        "comments": group_comments,
-                        "views_delta": sum(group_views_deltas) if group_views_deltas else None,
-                        "likes_delta": sum(group_likes_deltas) if group_likes_deltas else None,
-                        "comments_delta": sum(group_comments_deltas) if group_comments_deltas else None,
-                    },
+                    "summary": _summarize_group(rows),
                 }
             )
 
@@ -1295,6 +1648,7 @@ def dashboard(
             }
         )
 
+    cookie_file = _effective_instagram_cookie_file()
     return templates.TemplateResponse(
         "dashboard.html",
         {
@@ -1312,20 +1666,27 @@ def dashboard(
             "section": current_section,
             "video_sort": current_video_sort,
             "video_order": current_video_order,
-            "cookie_file_name": Path(_effective_instagram_cookie_file()).name if _effective_instagram_cookie_file() else "",
+            "cookie_file_name": Path(cookie_file).name if cookie_file else "",
             "is_authenticated": _is_authenticated(request),
             "t": lambda key, **kwargs: _t(lang, key, **kwargs),
             "fmt_date": _fmt_date_ru,
             "fmt_datetime": _fmt_datetime_ru,
-            "now": datetime.utcnow(),
+            "now": now,
         },
     )
 
 
-@app.get("/analytics/export.csv")
-def export_analytics_csv(session: Session = Depends(get_session)):
-    channels = session.exec(select(Channel).order_by(Channel.created_at.desc())).all()
+def _drain_csv_buffer(buffer: io.StringIO) -> bytes:
+    chunk = buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate(0)
+    return chunk
+
+
+def _iter_analytics_csv():
     buffer = io.StringIO()
+    # Keep the BOM so Excel detects UTF-8 (Cyrillic titles) like the buffered export did.
+    buffer.write("\ufeff")
     writer = csv.writer(buffer)
     writer.writerow(
         [
@@ -1350,69 +1711,94 @@ def export_analytics_csv(session: Session = Depends(get_session)):
         ]
     )
 
-    for channel in channels:
-        aggregates = _aggregate_for_channel(session, channel.id)
-        platform = _detect_platform(channel.url)
-        videos = session.exec(
-            select(Video)
-            .where(Video.channel_id == channel.id)
-            .order_by(Video.upload_date.desc(), Video.id.desc())
-            .limit(settings.max_videos_per_channel)
-        ).all()
-
-        if not videos:
-            writer.writerow(
-                [
-                    channel.id,
-                    channel.title,
-                    channel.url,
-                    platform,
+    yield _drain_csv_buffer(buffer)
+
+    # The request-scoped session is released before the body streams, so use a dedicated one.
+    with SessionLocal() as session:
+        channel_ids = session.exec(select(Channel.id)).all()
+        aggregates_by_channel = _aggregate_for_channels(session, list(channel_ids))
+        ranked = (
+            select(
+                Video.id.label("video_id"),
+                Video.channel_id,
+                func.row_number()
+                .over(partition_by=Video.channel_id, order_by=_VIDEO_FEED_ORDER)
+                .label("rn"),
+            )
+            .subquery()
+        )
+        rows = session.exec(
+            select(
+                Channel.id,
+                Channel.title,
+                Channel.url,
+                Channel.last_refreshed_at,
+                Channel.last_error,
+                ranked.c.rn,
+                Video.title.label("video_title"),
+                Video.url.label("video_url"),
+                Video.upload_date,
+                Video.view_count,
+                Video.like_count,
+                Video.comment_count,
+            )
+            .select_from(Channel)
+            .outerjoin(
+                ranked,
+                (ranked.c.channel_id == Channel.id) & (ranked.c.rn <= settings.max_videos_per_channel),
+            )
+            .outerjoin(Video, Video.id == ranked.c.video_id)
+            .order_by(Channel.created_at.desc(), Channel.id.desc(), ranked.c.rn)
+            .execution_options(yield_per=CSV_EXPORT_YIELD_PER)
+        )
+
+        current_channel_id: int | None = None
+        for row in rows:
+            if row.id != current_channel_id:
+                if current_channel_id is not None:
+                    yield _drain_csv_buffer(buffer)
+                current_channel_id = row.id
+                aggregates = aggregates_by_channel.get(row.id) or _empty_aggregates()
+                channel_columns = [
+                    row.id,
+                    row.title,
+                    row.url,
+                    _detect_platform(row.url),
                     settings.max_videos_per_channel,
-                    "",
-                    channel.last_refreshed_at.isoformat() if channel.last_refreshed_at else "",
-                    channel.last_error or "",
+                ]
+                channel_stats = [
+                    row.last_refreshed_at.isoformat() if row.last_refreshed_at else "",
+                    row.last_error or "",
                     aggregates["total_views"],
                     aggregates["avg_views"],
                     aggregates["median_views"],
                     aggregates["top_video_views"],
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
-                    "",
                 ]
-            )
-            continue
 
-        for idx, video in enumerate(videos, start=1):
+            if row.rn is None:
+                writer.writerow([*channel_columns, "", *channel_stats, "", "", "", "", "", ""])
+                continue
             writer.writerow(
                 [
-                    channel.id,
-                    channel.title,
-                    channel.url,
-                    platform,
-                    settings.max_videos_per_channel,
-                    idx,
-                    channel.last_refreshed_at.isoformat() if channel.last_refreshed_at else "",
-                    channel.last_error or "",
-                    aggregates["total_views"],
-                    aggregates["avg_views"],
-                    aggregates["median_views"],
-                    aggregates["top_video_views"],
-                    video.title,
-                    video.url,
-                    video.upload_date.isoformat() if video.upload_date else "",
-                    video.view_count if video.view_count is not None else "",
-                    video.like_count if video.like_count is not None else "",
-                    video.comment_count if video.comment_count is not None else "",
+                    *channel_columns,
+                    row.rn,
+                    *channel_stats,
+                    row.video_title,
+                    row.video_url,
+                    row.upload_date.isoformat() if row.upload_date else "",
+                    row.view_count if row.view_count is not None else "",
+                    row.like_count if row.like_count is not None else "",
+                    row.comment_count if row.comment_count is not None else "",
                 ]
             )
+        yield _drain_csv_buffer(buffer)
 
+
+@app.get("/analytics/export.csv")
+def export_analytics_csv():
     filename = f"yt_analytics_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
-    content = buffer.getvalue().encode("utf-8-sig")
     headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-    return Response(content=content, media_type="text/csv; charset=utf-8", headers=headers)
+    return StreamingResponse(_iter_analytics_csv(), media_type="text/csv; charset=utf-8", headers=headers)
 
 
 @app.post("/channels/add")
@@ -1437,7 +1823,8 @@ def add_channel(
     session.commit()
     session.refresh(channel)
 
-    ok, text = _refresh_channel(session, channel, lang=lang, force=True)
+    status, text = _refresh_channel(session, channel, lang=lang, force=True)
+    ok = status is not RefreshStatus.FAILED
     return RedirectResponse(url=_dashboard_url(section, msg=text if ok else None, error=None if ok else text), status_code=303)
 
 
@@ -1469,7 +1856,7 @@ def save_settings_route(
     elif COOKIE_STORE_FILE.is_file():
         cookie_path = str(COOKIE_STORE_FILE)
 
-    new_settings = update_settings(interval, max_videos, cookie_path)
+    new_settings = update_settings(interval, max_videos, cookie_path, current=settings)
     settings.refresh_interval_hours = new_settings.refresh_interval_hours
     settings.max_videos_per_channel = new_settings.max_videos_per_channel
     settings.instagram_cookie_file = new_settings.instagram_cookie_file
@@ -1535,15 +1922,17 @@ def upload_instagram_cookies_route(
 ):
     lang = _get_lang(request)
     if not instagram_cookie_upload or not instagram_cookie_upload.filename:
-        return JSONResponse({"ok": False, "error": _t(lang, "msg_settings_cookie_upload_failed")}, status_code=400)
+        return ORJSONResponse({"ok": False, "error": _t(lang, "msg_settings_cookie_upload_failed")}, status_code=400)
     try:
         saved = _save_instagram_cookie_file(instagram_cookie_upload)
     except Exception:
-        return JSONResponse({"ok": False, "error": _t(lang, "msg_settings_cookie_upload_failed")}, status_code=400)
+        return ORJSONResponse({"ok": False, "error": _t(lang, "msg_settings_cookie_upload_failed")}, status_code=400)
 
-    new_settings = update_settings(settings.refresh_interval_hours, settings.max_videos_per_channel, saved)
+    new_settings = update_settings(
+        settings.refresh_interval_hours, settings.max_videos_per_channel, saved, current=settings
+    )
     settings.instagram_cookie_file = new_settings.instagram_cookie_file
-    return JSONResponse(
+    return ORJSONResponse(
         {
             "ok": True,
             "message": _t(lang, "settings_cookie_upload_ok"),
@@ -1557,7 +1946,7 @@ def instagram_cookies_status(request: Request):
     lang = _get_lang(request)
     cookie_path = _effective_instagram_cookie_file()
     if not cookie_path:
-        return JSONResponse(
+        return ORJSONResponse(
             {
                 "ok": False,
                 "state": "missing",
@@ -1567,14 +1956,14 @@ def instagram_cookies_status(request: Request):
 
     ok, reason = _check_instagram_cookies(cookie_path)
     if ok:
-        return JSONResponse(
+        return ORJSONResponse(
             {
                 "ok": True,
                 "state": "ok",
                 "message": _t(lang, "settings_cookie_status_ok"),
             }
         )
-    return JSONResponse(
+    return ORJSONResponse(
         {
             "ok": False,
             "state": "invalid",
@@ -1597,7 +1986,8 @@ def refresh_channel(
     if not channel:
         return RedirectResponse(url=_dashboard_url(section, error=_t(lang, "msg_channel_not_found")), status_code=303)
 
-    ok, text = _refresh_channel(session, channel, lang=lang, force=bool(force))
+    status, text = _refresh_channel(session, channel, lang=lang, force=bool(force))
+    ok = status is not RefreshStatus.FAILED
     return RedirectResponse(url=_dashboard_url(section, msg=text if ok else None, error=None if ok else text), status_code=303)
 
 
@@ -1613,50 +2003,64 @@ def refresh_all_start(
     _cleanup_refresh_jobs()
     job_id = uuid4().hex
     with REFRESH_JOBS_LOCK:
-        REFRESH_JOBS[job_id] = {
-            "job_id": job_id,
-            "started_at": datetime.utcnow().isoformat(),
-            "finished": False,
-            "finished_at": "",
-            "cancel_requested": False,
-            "cancel_requested_at": "",
-            "cancelled": False,
-            "done": 0,
-            "total": 0,
-            "refreshed": 0,
-            "skipped": 0,
-            "failed": 0,
-            "current": "",
-            "message": "",
-            "redirect_url": _dashboard_url(section),
-        }
+        REFRESH_JOBS[job_id] = RefreshJob(job_id=job_id, redirect_url=_dashboard_url(section))
     background_tasks.add_task(_run_refresh_all_job, job_id, bool(force), lang, section)
-    return JSONResponse({"job_id": job_id})
+    return ORJSONResponse({"job_id": job_id})
 
 
 @app.get("/jobs/{job_id}")
 def get_job_status(job_id: str):
     _cleanup_refresh_jobs()
-    with REFRESH_JOBS_LOCK:
-        job = REFRESH_JOBS.get(job_id)
-        if not job:
-            return JSONResponse({"error": "job_not_found"}, status_code=404)
-        return JSONResponse(job)
+    job = REFRESH_JOBS.get(job_id)
+    if not job:
+        return ORJSONResponse({"error": "job_not_found"}, status_code=404)
+    return ORJSONResponse(job.to_dict())
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    job = REFRESH_JOBS.get(job_id)
+    if not job:
+        return ORJSONResponse({"error": "job_not_found"}, status_code=404)
+
+    async def event_stream():
+        changed = asyncio.Event()
+        subscriber = (asyncio.get_running_loop(), changed)
+        job.subscribers.append(subscriber)
+        try:
+            while True:
+                # Clear before reading so an update that lands mid-send still wakes the next wait.
+                changed.clear()
+                yield b"data: " + orjson.dumps(job.to_dict()) + b"\n\n"
+                if job.finished:
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=REFRESH_JOB_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            job.subscribers.remove(subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/jobs/{job_id}/stop")
 def stop_job(request: Request, job_id: str):
     lang = _get_lang(request)
-    with REFRESH_JOBS_LOCK:
-        job = REFRESH_JOBS.get(job_id)
-        if not job:
-            return JSONResponse({"error": "job_not_found"}, status_code=404)
-        if job.get("finished"):
-            return JSONResponse(job)
-        job["cancel_requested"] = True
-        job["cancel_requested_at"] = datetime.utcnow().isoformat()
-        job["message"] = _t(lang, "refresh_progress_stopping")
-        return JSONResponse({"job_id": job_id, "cancel_requested": True})
+    job = REFRESH_JOBS.get(job_id)
+    if not job:
+        return ORJSONResponse({"error": "job_not_found"}, status_code=404)
+    if job.finished:
+        return ORJSONResponse(job.to_dict())
+    job.cancel_requested_at = datetime.utcnow().isoformat()
+    job.message = _t(lang, "refresh_progress_stopping")
+    job.cancel_event.set()
+    job.notify()
+    return ORJSONResponse({"job_id": job_id, "cancel_requested": True})
 
 
 @app.post("/channels/refresh-all")
@@ -1668,21 +2072,26 @@ def refresh_all(
 ):
     lang = _get_lang(request)
     section = _safe_section(next_section)
-    channels = session.exec(select(Channel)).all()
-    if not channels:
+    channels, skipped = _load_channels_to_refresh(session, bool(force))
+    if not channels and not skipped:
         return RedirectResponse(url=_dashboard_url(section, msg=_t(lang, "msg_no_channels_to_refresh")), status_code=303)
 
     refreshed = 0
-    skipped = 0
     failed = 0
-    for channel in channels:
-        ok, text = _refresh_channel(session, channel, lang=lang, force=bool(force))
-        if ok and text == _t(lang, "msg_skipped_cache"):
-            skipped += 1
-        elif ok:
-            refreshed += 1
-        else:
-            failed += 1
+    snapshot_times = _load_latest_snapshot_times(session, [channel.id for channel in channels])
+    with ThreadPoolExecutor(max_workers=max(1, min(REFRESH_ALL_MAX_WORKERS, len(channels)))) as executor:
+        futures = [
+            executor.submit(_refresh_channel_isolated, channel.id, lang, bool(force), snapshot_times)
+            for channel in channels
+        ]
+        for future in as_completed(futures):
+            status, _ = future.result()
+            if status is RefreshStatus.SKIPPED:
+                skipped += 1
+            elif status is RefreshStatus.REFRESHED:
+                refreshed += 1
+            else:
+                failed += 1
 
     summary = _t(lang, "msg_done_summary", refreshed=refreshed, skipped=skipped, failed=failed)
     return RedirectResponse(url=_dashboard_url(section, msg=summary), status_code=303)
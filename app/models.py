@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from datetime import date, datetime
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -23,6 +24,8 @@ class Channel(SQLModel, table=True):
 
 
 class Video(SQLModel, table=True):
+    __table_args__ = (Index("ix_video_channel_upload", "channel_id", "upload_date", "id"),)
+
     id: int | None = Field(default=None, primary_key=True)
     channel_id: int = Field(foreign_key="channel.id", index=True)
     title: str
@@ -36,6 +39,8 @@ class Video(SQLModel, table=True):
     like_delta: int | None = None
     comment_delta: int | None = None
     thumbnail_url: str | None = None
+    # Index in the fetched feed; breaks upload_date ties the way delete-and-reinsert ids used to.
+    feed_position: int | None = None
     extracted_at: datetime = Field(default_factory=datetime.utcnow)
 
 
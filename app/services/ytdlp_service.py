@@ -1,25 +1,80 @@
 ﻿from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import date, datetime
+from datetime import date
+from functools import lru_cache
+import json
 from pathlib import Path
 import re
+from threading import Lock, local
 import time
-from typing import Any, Optional
+from typing import Any, Callable, Iterable, Optional
 from urllib.parse import urlparse
 import http.cookiejar
-import urllib.request
-import urllib.error
 
+import httpx
 from yt_dlp import YoutubeDL
 from yt_dlp.utils import DownloadError
 
+VIDEO_DETAILS_MAX_WORKERS = 8
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# VideoPayload fields a playlist entry must fill to skip the per-video detail extract.
+_REQUIRED_ENTRY_FIELDS = ("upload_date", "view_count")
+
+_MEDIA_URL_PREFIXES = ("http://", "https://")
+_INT_SEPARATORS = str.maketrans("", "", ", ")
+_UNICODE_ESCAPE_RE = re.compile(r"\\u([0-9a-fA-F]{4})")
+_TIKTOK_TITLE_SUFFIX_RE = re.compile(r"\s+on\s+TikTok\s*$", re.IGNORECASE)
+_MATCH_FLAGS = re.IGNORECASE | re.DOTALL
+# Alternatives are listed in priority order; _match_by_priority scans the page once for all of them.
+_TIKTOK_AVATAR_RE = re.compile(
+    r'<meta\s+property="og:image"\s+content="(?P<og>[^"]+)"'
+    r'|"avatarLarger":"(?P<large>[^"]+)"'
+    r'|"avatarMedium":"(?P<medium>[^"]+)"'
+    r'|"avatarThumb":"(?P<thumb>[^"]+)"'
+    r'|"avatar":"(?P<avatar>[^"]+)"',
+    _MATCH_FLAGS,
+)
+# Avatar-only fetches stop downloading once the page head has a non-empty og:image.
+_OG_IMAGE_BYTES_RE = re.compile(rb'<meta\s+property="og:image"\s+content="\s*[^"\s]', re.IGNORECASE)
+_TIKTOK_TITLE_RE = re.compile(
+    r'<meta\s+property="og:title"\s+content="(?P<og>[^"]+)"|<title>(?P<title>[^<]+)</title>',
+    _MATCH_FLAGS,
+)
+_TIKTOK_FOLLOWER_PATTERNS = (re.compile(r'"followerCount"\s*:\s*(\d+)', _MATCH_FLAGS),)
+_TIKTOK_REHYDRATION_RE = re.compile(
+    r'<script[^>]+id="__UNIVERSAL_DATA_FOR_REHYDRATION__"[^>]*>(.*?)</script>', re.DOTALL
+)
+
+BROWSER_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/124.0.0.0 Safari/537.36"
+)
+# Profile pages are a few hundred KB; anything past this is not worth buffering.
+MAX_HTML_BYTES = 4_000_000
+_HTML_CHUNK_BYTES = 16_384
+_HTTP_HEADERS = {"User-Agent": BROWSER_USER_AGENT, "Accept-Language": "en-US,en;q=0.9"}
+# Keep-alive pool for profile pages fetched without cookies (TikTok fallbacks and avatars).
+_HTTP_CLIENT = httpx.Client(follow_redirects=True, headers=_HTTP_HEADERS)
+# One pooled client per cookie file, rebuilt when the file changes: cookie_file -> (mtime_ns, client).
+_COOKIE_CLIENTS: dict[str, tuple[int, httpx.Client]] = {}
+_COOKIE_CLIENTS_LOCK = Lock()
+# Long-lived workers for detail extracts and avatar fallbacks, shared by concurrent channel fetches;
+# each worker keeps its own YoutubeDL instances (keyed by options) in _YDL_LOCAL across calls.
+_DETAILS_EXECUTOR = ThreadPoolExecutor(max_workers=VIDEO_DETAILS_MAX_WORKERS, thread_name_prefix="ytdlp")
+_YDL_LOCAL = local()
+# Every per-thread YoutubeDL, so shutdown() can close them from the main thread.
+_YDL_INSTANCES: list[YoutubeDL] = []
+_YDL_INSTANCES_LOCK = Lock()
+
 
 class YtDlpFetchError(Exception):
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class VideoPayload:
     title: str
     url: str
@@ -31,7 +86,7 @@ class VideoPayload:
     thumbnail_url: Optional[str]
 
 
-@dataclass
+@dataclass(slots=True)
 class ChannelPayload:
     title: str
     url: str
@@ -51,7 +106,12 @@ def _parse_upload_date(raw_date: str | None) -> Optional[date]:
     if not raw_date:
         return None
     try:
-        return date(int(raw_date[0:4]), int(raw_date[4:6]), int(raw_date[6:8]))
+        head = raw_date[:8]
+        # int() on the whole field would also accept signs, underscores and spaces; insist on YYYYMMDD.
+        if len(head) != 8 or not head.isdigit():
+            return None
+        year, month_day = divmod(int(head), 10000)
+        return date(year, *divmod(month_day, 100))
     except (ValueError, TypeError):
         return None
 
@@ -60,70 +120,61 @@ def _pick_best_thumbnail(thumbnails: Any) -> Optional[str]:
     if not isinstance(thumbnails, list):
         return None
 
-    candidates: list[tuple[int, str]] = []
-    for item in thumbnails:
-        if not isinstance(item, dict):
-            continue
-        url = _normalize_media_url(item.get("url"))
-        if not url:
-            continue
-        width = int(item.get("width") or 0)
-        height = int(item.get("height") or 0)
-        area = width * height
-        candidates.append((area, url))
+    def candidates():
+        for item in thumbnails:
+            if not isinstance(item, dict):
+                continue
+            url = _normalize_media_url(item.get("url"))
+            if url:
+                yield int(item.get("width") or 0) * int(item.get("height") or 0), url
 
-    if not candidates:
-        return None
-    candidates.sort(key=lambda item: item[0], reverse=True)
-    return candidates[0][1]
+    # max() keeps the first of equal areas, like the stable descending sort it replaces.
+    best = max(candidates(), key=lambda candidate: candidate[0], default=None)
+    return best[1] if best else None
 
 
 def _pick_avatar_like_thumbnail(thumbnails: Any) -> Optional[str]:
     if not isinstance(thumbnails, list):
         return None
-    candidates: list[tuple[int, str]] = []
-    for item in thumbnails:
-        if not isinstance(item, dict):
-            continue
-        url = _normalize_media_url(item.get("url"))
-        if not url:
-            continue
-        width = int(item.get("width") or 0)
-        height = int(item.get("height") or 0)
-        if width <= 0 or height <= 0:
-            continue
-        ratio = width / height
-        if ratio < 0.8 or ratio > 1.25:
-            continue
-        area = width * height
-        candidates.append((area, url))
-    if not candidates:
-        return None
-    candidates.sort(key=lambda item: item[0], reverse=True)
-    return candidates[0][1]
+
+    def candidates():
+        for item in thumbnails:
+            if not isinstance(item, dict):
+                continue
+            url = _normalize_media_url(item.get("url"))
+            if not url:
+                continue
+            width = int(item.get("width") or 0)
+            height = int(item.get("height") or 0)
+            if width <= 0 or height <= 0:
+                continue
+            ratio = width / height
+            if ratio < 0.8 or ratio > 1.25:
+                continue
+            yield width * height, url
+
+    best = max(candidates(), key=lambda candidate: candidate[0], default=None)
+    return best[1] if best else None
 
 
 def _normalize_media_url(raw: Any) -> Optional[str]:
     if not raw or not isinstance(raw, str):
         return None
+    # Most candidates are already clean https URLs; return those untouched.
+    if raw.startswith("https://") and "\\" not in raw and not raw[-1].isspace():
+        return raw
     value = raw.strip()
-    # Some platforms return escaped JSON strings like https:\\u002F\\u002F...
-    try:
-        import json
-
-        decoded = json.loads(f'"{value}"')
-        if isinstance(decoded, str):
-            value = decoded
-    except Exception:
-        pass
-    value = value.replace("\\/", "/")
-    value = re.sub(r"\\u([0-9a-fA-F]{4})", lambda m: chr(int(m.group(1), 16)), value)
+    if "\\" in value:
+        # Some platforms return escaped JSON strings like https:\\u002F\\u002F...
+        value = _decode_json_string(value)
+        value = value.replace("\\/", "/")
+        value = _UNICODE_ESCAPE_RE.sub(lambda m: chr(int(m.group(1), 16)), value)
     if not value:
         return None
     if value.startswith("//"):
         value = f"https:{value}"
-    parsed = urlparse(value)
-    if parsed.scheme not in {"http", "https"}:
+    # A prefix check is enough here; schemes are case-insensitive, so only the prefix is folded.
+    if not value[:8].lower().startswith(_MEDIA_URL_PREFIXES):
         return None
     return value
 
@@ -181,71 +232,68 @@ def _extract_instagram_username(url: str) -> Optional[str]:
     return parts[0]
 
 
+def _cookie_client(cookie_file: str) -> httpx.Client:
+    mtime_ns = Path(cookie_file).stat().st_mtime_ns
+    with _COOKIE_CLIENTS_LOCK:
+        cached = _COOKIE_CLIENTS.get(cookie_file)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        jar = http.cookiejar.MozillaCookieJar()
+        jar.load(cookie_file, ignore_discard=True, ignore_expires=True)
+        client = httpx.Client(cookies=jar, follow_redirects=True, headers=_HTTP_HEADERS)
+        if cached is not None:
+            cached[1].close()
+        _COOKIE_CLIENTS[cookie_file] = (mtime_ns, client)
+        return client
+
+
+def _read_html(
+    client: httpx.Client,
+    url: str,
+    headers: dict[str, str],
+    timeout: float,
+    stop_at: Optional[re.Pattern[bytes]] = None,
+) -> str:
+    body = bytearray()
+    with client.stream("GET", url, headers=headers, timeout=timeout) as resp:
+        resp.raise_for_status()
+        for chunk in resp.iter_bytes(_HTML_CHUNK_BYTES):
+            # Rescan a little of the previous chunk so a match split across chunks is still found.
+            scan_from = max(0, len(body) - 256)
+            body += chunk
+            if len(body) >= MAX_HTML_BYTES:
+                del body[MAX_HTML_BYTES:]
+                break
+            if stop_at is not None and stop_at.search(body, scan_from):
+                break
+    return body.decode("utf-8", errors="ignore")
+
+
 def _fetch_html(url: str, cookie_file: str) -> str:
-    jar = http.cookiejar.MozillaCookieJar()
-    jar.load(cookie_file, ignore_discard=True, ignore_expires=True)
-    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
-    req = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/124.0.0.0 Safari/537.36"
-            ),
-            "Accept-Language": "en-US,en;q=0.9",
-            "Referer": "https://www.instagram.com/",
-        },
-    )
-    with opener.open(req, timeout=25) as resp:
-        return resp.read().decode("utf-8", errors="ignore")
+    return _read_html(_cookie_client(cookie_file), url, {"Referer": "https://www.instagram.com/"}, 25)
 
 
 def _fetch_json(url: str, cookie_file: str) -> dict[str, Any]:
-    jar = http.cookiejar.MozillaCookieJar()
-    jar.load(cookie_file, ignore_discard=True, ignore_expires=True)
-    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
-    req = urllib.request.Request(
+    resp = _cookie_client(cookie_file).get(
         url,
         headers={
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/124.0.0.0 Safari/537.36"
-            ),
-            "Accept-Language": "en-US,en;q=0.9",
             "Referer": "https://www.instagram.com/",
             "x-ig-app-id": "936619743392459",
             "x-requested-with": "XMLHttpRequest",
         },
+        timeout=25,
     )
-    with opener.open(req, timeout=25) as resp:
-        raw = resp.read().decode("utf-8", errors="ignore")
-        import json
-
-        return json.loads(raw)
+    resp.raise_for_status()
+    return json.loads(resp.content.decode("utf-8", errors="ignore"))
 
 
-def _fetch_html_without_cookies(url: str) -> str:
-    req = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/124.0.0.0 Safari/537.36"
-            ),
-            "Accept-Language": "en-US,en;q=0.9",
-            "Referer": "https://www.tiktok.com/",
-        },
-    )
-    with urllib.request.urlopen(req, timeout=20) as resp:
-        return resp.read().decode("utf-8", errors="ignore")
+def _fetch_html_without_cookies(url: str, stop_at: Optional[re.Pattern[bytes]] = None) -> str:
+    return _read_html(_HTTP_CLIENT, url, {"Referer": "https://www.tiktok.com/"}, 20, stop_at)
 
 
-def _match_first(text: str, patterns: list[str]) -> Optional[str]:
+def _match_first(text: str, patterns: Iterable[re.Pattern[str]]) -> Optional[str]:
     for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+        match = pattern.search(text)
         if match:
             value = match.group(1).strip()
             if value:
@@ -253,13 +301,28 @@ def _match_first(text: str, patterns: list[str]) -> Optional[str]:
     return None
 
 
+def _match_by_priority(text: str, pattern: re.Pattern[str]) -> Optional[str]:
+    # Each alternative has one group, numbered in priority order, so an earlier alternative wins
+    # even when a later one matches first in the text.
+    best_index = pattern.groups + 1
+    best_value = None
+    for match in pattern.finditer(text):
+        index = match.lastindex or best_index
+        if index >= best_index:
+            continue
+        value = match.group(index).strip()
+        if value:
+            best_index, best_value = index, value
+            if index == 1:
+                break
+    return best_value
+
+
 def _to_int(raw: Optional[str]) -> Optional[int]:
     if raw is None:
         return None
-    cleaned = raw.replace(",", "").replace(" ", "").strip()
-    if not cleaned.isdigit():
-        return None
-    return int(cleaned)
+    cleaned = raw.translate(_INT_SEPARATORS).strip()
+    return int(cleaned) if cleaned.isdigit() else None
 
 
 def _fetch_instagram_channel_data(url: str, max_videos: int, cookie_file: str) -> ChannelPayload:
@@ -273,12 +336,13 @@ def _fetch_instagram_channel_data(url: str, max_videos: int, cookie_file: str) -
     api_url = f"https://www.instagram.com/api/v1/feed/user/{username}/username/?count={max_videos * 2}"
     try:
         payload = _fetch_json(api_url, cookie_file)
-    except urllib.error.HTTPError as exc:
-        if exc.code == 429:
+    except httpx.HTTPStatusError as exc:
+        status_code = exc.response.status_code
+        if status_code == 429:
             raise YtDlpFetchError("Instagram rate-limited the request (HTTP 429). Try again later.") from exc
-        if exc.code in {401, 403}:
+        if status_code in {401, 403}:
             raise YtDlpFetchError("Instagram rejected cookies (401/403). Export cookies again and retry.") from exc
-        raise YtDlpFetchError(f"Instagram request failed: HTTP {exc.code}") from exc
+        raise YtDlpFetchError(f"Instagram request failed: HTTP {status_code}") from exc
     except Exception as exc:
         raise YtDlpFetchError(f"Instagram request failed: {exc}") from exc
 
@@ -288,35 +352,29 @@ def _fetch_instagram_channel_data(url: str, max_videos: int, cookie_file: str) -
     items = payload.get("items") or []
     videos: list[VideoPayload] = []
     for item in items:
-        media_type = item.get("media_type")
-        product_type = str(item.get("product_type") or "")
-        is_reel_like = (media_type == 2) or (product_type == "clips") or bool(item.get("clips_metadata"))
-        if not is_reel_like:
+        get = item.get
+        if get("media_type") != 2 and get("product_type") != "clips" and not get("clips_metadata"):
             continue
 
-        code = item.get("code")
+        code = get("code")
         if not code:
             continue
-        caption = ((item.get("caption") or {}).get("text") or "").strip()
-        if caption:
-            title_text = caption[:80]
-        else:
-            title_text = f"Reel {code}"
-
-        candidates = ((item.get("image_versions2") or {}).get("candidates") or [])
-        thumbnail = None
-        for candidate in candidates:
-            if isinstance(candidate, dict):
-                thumbnail = _normalize_media_url(candidate.get("url"))
-                if thumbnail:
-                    break
-
-        taken_at = item.get("taken_at")
+        caption = ((get("caption") or {}).get("text") or "").strip()
+        title_text = caption[:80] if caption else f"Reel {code}"
+
+        candidates = (get("image_versions2") or {}).get("candidates") or []
+        thumbnail = next(
+            filter(None, (_normalize_media_url(c.get("url")) for c in candidates if isinstance(c, dict))),
+            None,
+        )
+
+        taken_at = get("taken_at")
         upload_date = None
         if isinstance(taken_at, int):
+            # UTC calendar day straight from the epoch offset, without building a datetime.
             try:
-                upload_date = datetime.utcfromtimestamp(taken_at).date()
-            except Exception:
+                upload_date = date.fromordinal(_EPOCH_ORDINAL + taken_at // 86400)
+            except (ValueError, OverflowError):
                 upload_date = None
 
         videos.append(
@@ -324,10 +382,10 @@ def _fetch_instagram_channel_data(url: str, max_videos: int, cookie_file: str) -
                 title=title_text,
                 url=f"https://www.instagram.com/reel/{code}/",
                 upload_date=upload_date,
-                duration_seconds=item.get("video_duration"),
-                view_count=item.get("play_count") or item.get("view_count") or item.get("video_view_count"),
-                like_count=item.get("like_count"),
-                comment_count=item.get("comment_count"),
+                duration_seconds=get("video_duration"),
+                view_count=get("play_count") or get("view_count") or get("video_view_count"),
+                like_count=get("like_count"),
+                comment_count=get("comment_count"),
                 thumbnail_url=thumbnail,
             )
         )
@@ -350,19 +408,10 @@ def _fetch_instagram_channel_data(url: str, max_videos: int, cookie_file: str) -
 
 def _fetch_tiktok_avatar_from_page(url: str) -> Optional[str]:
     try:
-        html = _fetch_html_without_cookies(url)
+        html = _fetch_html_without_cookies(url, stop_at=_OG_IMAGE_BYTES_RE)
     except Exception:
         return None
-    raw = _match_first(
-        html,
-        [
-            r'<meta\s+property="og:image"\s+content="([^"]+)"',
-            r'"avatarLarger":"([^"]+)"',
-            r'"avatarMedium":"([^"]+)"',
-            r'"avatarThumb":"([^"]+)"',
-            r'"avatar":"([^"]+)"',
-        ],
-    )
+    raw = _match_by_priority(html, _TIKTOK_AVATAR_RE)
     return _normalize_media_url(raw)
 
 
@@ -454,9 +503,10 @@ def _extract_tiktok_username_from_url(url: str) -> Optional[str]:
 
 
 def _decode_json_string(raw: str) -> str:
+    # Without a backslash there is nothing to unescape; skip the JSON parser for the common case.
+    if "\\" not in raw:
+        return raw
     try:
-        import json
-
         decoded = json.loads(f'"{raw}"')
         if isinstance(decoded, str):
             return decoded
@@ -465,39 +515,66 @@ def _decode_json_string(raw: str) -> str:
     return raw
 
 
+@lru_cache(maxsize=256)
+def _tiktok_video_id_pattern(username: str) -> re.Pattern[str]:
+    return re.compile(rf"/@{re.escape(username)}/video/(\d+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def _tiktok_video_desc_patterns(video_id: str) -> tuple[re.Pattern[str], ...]:
+    escaped = re.escape(video_id)
+    return (
+        re.compile(rf'"id":"{escaped}".{{0,400}}"desc":"([^"]*)"', _MATCH_FLAGS),
+        re.compile(rf'"video":\{{"id":"{escaped}".{{0,400}}"desc":"([^"]*)"', _MATCH_FLAGS),
+    )
+
+
+def _extract_tiktok_user_detail(html: str) -> dict[str, Any]:
+    # Profile pages embed their state as one JSON blob; parse it once instead of probing the HTML.
+    match = _TIKTOK_REHYDRATION_RE.search(html)
+    if not match:
+        return {}
+    try:
+        data = json.loads(match.group(1))
+        user_detail = data["__DEFAULT_SCOPE__"]["webapp.user-detail"]["userInfo"]
+    except (ValueError, KeyError, TypeError):
+        return {}
+    return user_detail if isinstance(user_detail, dict) else {}
+
+
 def _fetch_tiktok_channel_data_from_page(url: str, max_videos: int) -> ChannelPayload:
     html = _fetch_html_without_cookies(url)
     username = _extract_tiktok_username_from_url(url) or "tiktok_user"
     canonical_url = f"https://www.tiktok.com/@{username}"
 
-    title = _match_first(
-        html,
-        [
-            r'<meta\s+property="og:title"\s+content="([^"]+)"',
-            r"<title>([^<]+)</title>",
-        ],
-    ) or username
-    title = re.sub(r"\s+on\s+TikTok\s*$", "", title, flags=re.IGNORECASE).strip() or username
+    title = _match_by_priority(html, _TIKTOK_TITLE_RE) or username
+    title = _TIKTOK_TITLE_SUFFIX_RE.sub("", title).strip() or username
 
-    avatar_url = _fetch_tiktok_avatar_from_page(canonical_url) or _fetch_tiktok_avatar_from_page(url)
-    follower_raw = _match_first(html, [r'"followerCount"\s*:\s*(\d+)'])
-    subscriber_count = int(follower_raw) if follower_raw and follower_raw.isdigit() else None
+    user_detail = _extract_tiktok_user_detail(html)
+    user = user_detail.get("user") or {}
+    stats = user_detail.get("stats") or {}
+
+    # The profile page is already in hand; only download it again when it has no avatar at all.
+    avatar_url = (
+        _normalize_media_url(_match_by_priority(html, _TIKTOK_AVATAR_RE))
+        or _pick_first_url(user.get("avatarLarger"), user.get("avatarMedium"), user.get("avatarThumb"))
+        or _fetch_tiktok_avatar_from_page(canonical_url)
+    )
+    subscriber_count = stats.get("followerCount")
+    if not isinstance(subscriber_count, int):
+        follower_raw = _match_first(html, _TIKTOK_FOLLOWER_PATTERNS)
+        subscriber_count = int(follower_raw) if follower_raw and follower_raw.isdigit() else None
 
-    video_id_matches = re.findall(rf"/@{re.escape(username)}/video/(\d+)", html, flags=re.IGNORECASE)
     seen_ids: set[str] = set()
     videos: list[VideoPayload] = []
-    for video_id in video_id_matches:
+    # finditer stops scanning the page as soon as max_videos unique ids are collected.
+    for video_id_match in _tiktok_video_id_pattern(username).finditer(html):
+        video_id = video_id_match.group(1)
         if video_id in seen_ids:
             continue
         seen_ids.add(video_id)
         video_url = f"https://www.tiktok.com/@{username}/video/{video_id}"
-        desc_raw = _match_first(
-            html,
-            [
-                rf'"id":"{re.escape(video_id)}".{{0,400}}"desc":"([^"]*)"',
-                rf'"video":\{{"id":"{re.escape(video_id)}".{{0,400}}"desc":"([^"]*)"',
-            ],
-        )
+        desc_raw = _match_first(html, _tiktok_video_desc_patterns(video_id))
         title_text = _decode_json_string(desc_raw).strip() if desc_raw else f"TikTok video {video_id}"
         if len(title_text) > 120:
             title_text = title_text[:117] + "..."
@@ -547,6 +624,58 @@ def _extract_info_with_backoff(ydl: YoutubeDL, url: str, retries: int = 3) -> An
     return None
 
 
+def _thread_youtube_dl(opts: dict[str, Any]) -> YoutubeDL:
+    # YoutubeDL is not safe to share across threads, but one instance per worker thread can serve
+    # that worker's extracts back to back without paying extractor setup again.
+    instances: dict[tuple[tuple[str, Any], ...], YoutubeDL] | None = getattr(_YDL_LOCAL, "instances", None)
+    if instances is None:
+        instances = _YDL_LOCAL.instances = {}
+    key = tuple(sorted(opts.items()))
+    ydl = instances.get(key)
+    if ydl is None:
+        ydl = instances[key] = YoutubeDL(opts)
+        with _YDL_INSTANCES_LOCK:
+            _YDL_INSTANCES.append(ydl)
+    return ydl
+
+
+def shutdown() -> None:
+    _DETAILS_EXECUTOR.shutdown(wait=True, cancel_futures=True)
+    with _YDL_INSTANCES_LOCK:
+        instances = list(_YDL_INSTANCES)
+        _YDL_INSTANCES.clear()
+    for ydl in instances:
+        ydl.close()
+    with _COOKIE_CLIENTS_LOCK:
+        for _, client in _COOKIE_CLIENTS.values():
+            client.close()
+        _COOKIE_CLIENTS.clear()
+    _HTTP_CLIENT.close()
+
+
+def _fetch_video_details(video_opts: dict[str, Any], entry_url: str) -> dict[str, Any]:
+    try:
+        details = _extract_info_with_backoff(_thread_youtube_dl(video_opts), entry_url)
+    except DownloadError:
+        return {}
+    return details if isinstance(details, dict) else {}
+
+
+def _merge_video_details(video: VideoPayload, details: dict[str, Any], entry: dict[str, Any]) -> VideoPayload:
+    if not details:
+        return video
+    return VideoPayload(
+        title=details.get("title") or video.title,
+        url=details.get("webpage_url") or video.url,
+        upload_date=_parse_upload_date(details.get("upload_date")) or video.upload_date,
+        duration_seconds=details.get("duration") or video.duration_seconds,
+        view_count=details.get("view_count") if details.get("view_count") is not None else video.view_count,
+        like_count=details.get("like_count") if details.get("like_count") is not None else video.like_count,
+        comment_count=details.get("comment_count") if details.get("comment_count") is not None else video.comment_count,
+        thumbnail_url=_extract_video_thumbnail(details, entry),
+    )
+
+
 def fetch_channel_data(channel_url: str, max_videos: int, instagram_cookie_file: str = "") -> ChannelPayload:
     url = _normalize_channel_url(channel_url)
     if _is_instagram_url(url):
@@ -591,10 +720,12 @@ def fetch_channel_data(channel_url: str, max_videos: int, instagram_cookie_file:
     entries = channel_info.get("entries") or []
     videos: list[VideoPayload] = []
     avatar_url = _extract_avatar(channel_info, source_url=url)
+    # Profile-page avatar fallbacks run alongside the video detail extracts below.
+    avatar_lookup: Callable[[str], Optional[str]] | None = None
     if (not avatar_url) and _is_tiktok_url(url):
-        avatar_url = _fetch_tiktok_avatar_from_page(url)
-    if (not avatar_url) and _is_youtube_url(url):
-        avatar_url = _fetch_youtube_avatar_from_profile(url)
+        avatar_lookup = _fetch_tiktok_avatar_from_page
+    elif (not avatar_url) and _is_youtube_url(url):
+        avatar_lookup = _fetch_youtube_avatar_from_profile
     video_opts = {
         "quiet": True,
         "skip_download": True,
@@ -603,52 +734,46 @@ def fetch_channel_data(channel_url: str, max_videos: int, instagram_cookie_file:
     if use_instagram_cookies:
         video_opts["cookiefile"] = cookie_file
 
-    with YoutubeDL(video_opts) as video_ydl:
-        for entry in entries[:max_videos]:
-            entry_url = entry.get("url") or entry.get("webpage_url")
-            if not entry_url:
-                continue
-            if not str(entry_url).startswith("http"):
-                entry_url = f"https://www.youtube.com/watch?v={entry_url}"
-
-            # Prefer already available metadata from playlist entries to reduce network calls.
-            title = entry.get("title") or "Untitled video"
-            upload_date = _parse_upload_date(entry.get("upload_date"))
-            view_count = entry.get("view_count")
-            like_count = entry.get("like_count")
-            comment_count = entry.get("comment_count")
-            duration_seconds = entry.get("duration")
-            thumbnail_url = _pick_first_url(entry.get("thumbnail")) or _pick_best_thumbnail(entry.get("thumbnails"))
-
-            need_details = (
-                upload_date is None
-                or view_count is None
-                or (like_count is None and comment_count is None)
-                or thumbnail_url is None
-            )
-            details: dict[str, Any] = {}
-            if need_details:
-                try:
-                    maybe_details = _extract_info_with_backoff(video_ydl, str(entry_url))
-                    if isinstance(maybe_details, dict):
-                        details = maybe_details
-                except DownloadError:
-                    details = {}
-
-            videos.append(
-                VideoPayload(
-                    title=details.get("title") or title,
-                    url=details.get("webpage_url") or str(entry_url),
-                    upload_date=_parse_upload_date(details.get("upload_date")) or upload_date,
-                    duration_seconds=details.get("duration") or duration_seconds,
-                    view_count=details.get("view_count") if details.get("view_count") is not None else view_count,
-                    like_count=details.get("like_count") if details.get("like_count") is not None else like_count,
-                    comment_count=(
-                        details.get("comment_count") if details.get("comment_count") is not None else comment_count
-                    ),
-                    thumbnail_url=_extract_video_thumbnail(details, entry) if details else thumbnail_url,
-                )
-            )
+    # Playlist entries first; only the ones missing metadata need a per-video extract afterwards.
+    detail_requests: list[tuple[int, dict[str, Any], str]] = []
+    for entry in entries[:max_videos]:
+        entry_url = entry.get("url") or entry.get("webpage_url")
+        if not entry_url:
+            continue
+        if not str(entry_url).startswith("http"):
+            entry_url = f"https://www.youtube.com/watch?v={entry_url}"
+
+        # Prefer already available metadata from playlist entries to reduce network calls.
+        video = VideoPayload(
+            title=entry.get("title") or "Untitled video",
+            url=str(entry_url),
+            upload_date=_parse_upload_date(entry.get("upload_date")),
+            duration_seconds=entry.get("duration"),
+            view_count=entry.get("view_count"),
+            like_count=entry.get("like_count"),
+            comment_count=entry.get("comment_count"),
+            thumbnail_url=_pick_first_url(entry.get("thumbnail")) or _pick_best_thumbnail(entry.get("thumbnails")),
+        )
+        # A missing thumbnail alone is not worth a detail extract; refresh keeps the previous one.
+        need_details = any(getattr(video, field) is None for field in _REQUIRED_ENTRY_FIELDS) or (
+            video.like_count is None and video.comment_count is None
+        )
+        if need_details:
+            detail_requests.append((len(videos), entry, str(entry_url)))
+        videos.append(video)
+
+    if detail_requests or avatar_lookup:
+        # All remaining calls are network-bound, so overlap them; map() keeps results in request order.
+        avatar_future = _DETAILS_EXECUTOR.submit(avatar_lookup, url) if avatar_lookup else None
+        all_details = _DETAILS_EXECUTOR.map(
+            _fetch_video_details,
+            [video_opts] * len(detail_requests),
+            [entry_url for _, _, entry_url in detail_requests],
+        )
+        for (index, entry, _), details in zip(detail_requests, all_details):
+            videos[index] = _merge_video_details(videos[index], details, entry)
+        if avatar_future is not None:
+            avatar_url = avatar_future.result()
     channel_title = channel_info.get("title") or channel_info.get("channel") or "Unknown channel"
     canonical_url = (
         channel_info.get("webpage_url")
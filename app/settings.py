@@ -3,10 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 import os
 from pathlib import Path
+import re
 import tomllib
 
 
-@dataclass
+@dataclass(slots=True)
 class AppSettings:
     refresh_interval_hours: int = 6
     max_videos_per_channel: int = 12
@@ -16,60 +17,59 @@ class AppSettings:
     telegram_allowed_user_id: str = ""
 
 
-SETTINGS_FILE = Path(__file__).resolve().parent.parent / "settings.toml"
-DOTENV_FILE = Path(__file__).resolve().parent.parent / ".env"
+_ROOT_DIR = Path(__file__).resolve().parent.parent
+SETTINGS_FILE = _ROOT_DIR / "settings.toml"
+DOTENV_FILE = _ROOT_DIR / ".env"
+_TOML_ESCAPE_TABLE = str.maketrans({"\\": "\\\\", '"': '\\"'})
+# KEY=value per line; blank lines, comment lines and lines without "=" never match.
+_DOTENV_LINE_RE = re.compile(r"^(?![^\S\n]*#)[^\S\n]*([^=\n]+)=(.*)$", re.MULTILINE)
 
 
 def _toml_escape(value: str) -> str:
-    return value.replace("\\", "\\\\").replace('"', '\\"')
+    return value.translate(_TOML_ESCAPE_TABLE)
 
 
 def _normalize_bot_username(value: str) -> str:
-    return (value or "").strip().lstrip("@")
+    return value.strip().lstrip("@") if value else ""
 
 
-def _load_dotenv_file(path: Path) -> None:
-    if not path.exists():
-        return
+def _write_file(path: Path, data: bytes | bytearray) -> None:
+    # Leave an identical file alone so its mtime stays put.
+    try:
+        if path.read_bytes() == data:
+            return
+    except OSError:
+        pass
+    path.write_bytes(data)
 
-    for raw_line in path.read_text(encoding="utf-8").splitlines():
-        line = raw_line.strip()
-        if not line or line.startswith("#") or "=" not in line:
-            continue
-        key, value = line.split("=", 1)
-        key = key.strip()
-        if not key:
-            continue
-        value = value.strip()
-        if (value.startswith('"') and value.endswith('"')) or (value.startswith("'") and value.endswith("'")):
-            value = value[1:-1]
-        os.environ.setdefault(key, value)
 
-
-_load_dotenv_file(DOTENV_FILE)
-
-
-def _read_dotenv_map(path: Path) -> dict[str, str]:
+def _parse_dotenv(path: Path) -> dict[str, str]:
     result: dict[str, str] = {}
-    if not path.exists():
+    try:
+        text = path.read_text(encoding="utf-8")
+    except (FileNotFoundError, IsADirectoryError):
         return result
-    for raw_line in path.read_text(encoding="utf-8").splitlines():
-        line = raw_line.strip()
-        if not line or line.startswith("#") or "=" not in line:
-            continue
-        key, value = line.split("=", 1)
-        key = key.strip()
+    for match in _DOTENV_LINE_RE.finditer(text):
+        key = match.group(1).strip()
         if not key:
             continue
-        value = value.strip()
-        if (value.startswith('"') and value.endswith('"')) or (value.startswith("'") and value.endswith("'")):
+        value = match.group(2).strip()
+        if value and value[0] == value[-1] and value[0] in "\"'":
             value = value[1:-1]
         result[key] = value
     return result
 
 
+def _load_dotenv_file(path: Path) -> None:
+    for key, value in _parse_dotenv(path).items():
+        os.environ.setdefault(key, value)
+
+
+_load_dotenv_file(DOTENV_FILE)
+
+
 def write_auth_env_settings(telegram_bot_username: str, telegram_bot_token: str, telegram_allowed_user_id: str) -> None:
-    env_map = _read_dotenv_map(DOTENV_FILE)
+    env_map = _parse_dotenv(DOTENV_FILE)
     env_map["TELEGRAM_BOT_USERNAME"] = _normalize_bot_username(telegram_bot_username or "")
     env_map["TELEGRAM_BOT_TOKEN"] = (telegram_bot_token or "").strip()
     env_map["TELEGRAM_ALLOWED_USER_ID"] = (telegram_allowed_user_id or "").strip()
@@ -82,35 +82,40 @@ def write_auth_env_settings(telegram_bot_username: str, telegram_bot_token: str,
     ]
     extra_keys = sorted(key for key in env_map.keys() if key not in ordered_keys)
     final_keys = [key for key in ordered_keys if key in env_map] + extra_keys
-    content = "".join(f"{key}={env_map[key]}\n" for key in final_keys)
-    DOTENV_FILE.write_text(content, encoding="utf-8")
+    content = bytearray()
+    for key in final_keys:
+        content += f"{key}={env_map[key]}\n".encode("utf-8")
+    _write_file(DOTENV_FILE, content)
 
-    for key in ["TELEGRAM_BOT_USERNAME", "TELEGRAM_BOT_TOKEN", "TELEGRAM_ALLOWED_USER_ID"]:
-        os.environ[key] = env_map.get(key, "")
+    env = os.environ
+    for key in ("TELEGRAM_BOT_USERNAME", "TELEGRAM_BOT_TOKEN", "TELEGRAM_ALLOWED_USER_ID"):
+        value = env_map.get(key, "")
+        # Saving the same credentials again is common; skip the putenv() when nothing changed.
+        if env.get(key) != value:
+            env[key] = value
 
 
 def load_settings() -> AppSettings:
+    env = os.environ
     if not SETTINGS_FILE.exists():
         return AppSettings(
-            telegram_bot_token=(os.getenv("TELEGRAM_BOT_TOKEN", "") or "").strip(),
-            telegram_bot_username=_normalize_bot_username(os.getenv("TELEGRAM_BOT_USERNAME", "") or ""),
-            telegram_allowed_user_id=(os.getenv("TELEGRAM_ALLOWED_USER_ID", "") or "").strip(),
+            telegram_bot_token=(env.get("TELEGRAM_BOT_TOKEN", "") or "").strip(),
+            telegram_bot_username=_normalize_bot_username(env.get("TELEGRAM_BOT_USERNAME", "") or ""),
+            telegram_allowed_user_id=(env.get("TELEGRAM_ALLOWED_USER_ID", "") or "").strip(),
         )
 
-    with SETTINGS_FILE.open("rb") as fh:
-        data = tomllib.load(fh)
-
+    data = tomllib.loads(SETTINGS_FILE.read_text(encoding="utf-8"))
     section = data.get("app", {})
     return AppSettings(
         refresh_interval_hours=int(section.get("refresh_interval_hours", 6)),
         max_videos_per_channel=int(section.get("max_videos_per_channel", 12)),
         instagram_cookie_file=str(section.get("instagram_cookie_file", "") or "").strip(),
-        telegram_bot_token=(os.getenv("TELEGRAM_BOT_TOKEN") or str(section.get("telegram_bot_token", "")) or "").strip(),
+        telegram_bot_token=(env.get("TELEGRAM_BOT_TOKEN") or str(section.get("telegram_bot_token", "")) or "").strip(),
         telegram_bot_username=_normalize_bot_username(
-            os.getenv("TELEGRAM_BOT_USERNAME") or str(section.get("telegram_bot_username", "")) or ""
+            env.get("TELEGRAM_BOT_USERNAME") or str(section.get("telegram_bot_username", "")) or ""
         ),
         telegram_allowed_user_id=(
-            os.getenv("TELEGRAM_ALLOWED_USER_ID") or str(section.get("telegram_allowed_user_id", "")) or ""
+            env.get("TELEGRAM_ALLOWED_USER_ID") or str(section.get("telegram_allowed_user_id", "")) or ""
         ).strip(),
     )
 
@@ -122,10 +127,14 @@ def update_settings(
     telegram_bot_token: str | None = None,
     telegram_bot_username: str | None = None,
     telegram_allowed_user_id: str | None = None,
+    current: AppSettings | None = None,
 ) -> AppSettings:
-    current = load_settings()
+    # Validate first so bad input fails before any settings are read.
     safe_interval = max(1, min(int(refresh_interval_hours), 168))
     safe_videos = max(1, min(int(max_videos_per_channel), 100))
+    # Current values only fill in Telegram fields the caller left out, so skip the reparse when all are given.
+    if current is None and None in (telegram_bot_token, telegram_bot_username, telegram_allowed_user_id):
+        current = load_settings()
     safe_cookie_path = (instagram_cookie_file or "").strip()
     safe_bot_token = (
         current.telegram_bot_token if telegram_bot_token is None else (telegram_bot_token or "").strip()
@@ -149,19 +158,19 @@ def update_settings(
         telegram_bot_username=safe_bot_username,
         telegram_allowed_user_id=safe_allowed_user_id,
     )
-    content = (
-        "[app]\n"
+    content = bytearray(b"[app]\n")
+    content += (
         f"refresh_interval_hours = {new_settings.refresh_interval_hours}\n"
         f"max_videos_per_channel = {new_settings.max_videos_per_channel}\n"
         f"instagram_cookie_file = \"{_toml_escape(new_settings.instagram_cookie_file)}\"\n"
-    )
+    ).encode("utf-8")
     if telegram_bot_token is not None or telegram_bot_username is not None or telegram_allowed_user_id is not None:
         content += (
             f"telegram_bot_token = \"{_toml_escape(new_settings.telegram_bot_token)}\"\n"
             f"telegram_bot_username = \"{_toml_escape(new_settings.telegram_bot_username)}\"\n"
             f"telegram_allowed_user_id = \"{_toml_escape(new_settings.telegram_allowed_user_id)}\"\n"
-        )
-    SETTINGS_FILE.write_text(content, encoding="utf-8")
+        ).encode("utf-8")
+    _write_file(SETTINGS_FILE, content)
     return new_settings
 
 